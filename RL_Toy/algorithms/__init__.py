@@ -0,0 +1 @@
+from RL_Toy.algorithms.dp import valueIteration, policyIteration, modifiedPolicyIteration
\ No newline at end of file
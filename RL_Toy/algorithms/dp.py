@@ -0,0 +1,162 @@
+"""
+    Dynamic programming solvers over the array form of the grid
+    environments. All of them accept a gridWorld, stochasticGridWorld
+    or their gridModel and return
+
+        V, pi, residuals
+
+    with V and pi shaped as the grid. pi is compatible with gridPolicy.pi
+    and residuals is the list of the sup norm of the Bellman residual per
+    iteration.
+"""
+from RL_Toy.base.const import *
+
+def _getModel(env):
+    if hasattr(env, "getModel"):
+        return env.getModel()
+    return env
+
+def _Q(model, V, gamma:float):
+    """
+    Returns R + gamma * E[V] for all the pairs.
+    """
+    Q = model.expectedValue(V)
+    Q *= gamma
+    Q += model.R
+    return Q
+
+def _evaluate(model, actions, V, gamma:float, sweeps:int, tol:float):
+    """
+    Iterative evaluation of the deterministic policy actions starting
+    from V. Stops after sweeps iterations or when the change is below tol.
+    """
+    R = model.selectActions(model.R, actions)
+    for _ in range(sweeps):
+        newV = model.expectedValue(V, actions)
+        newV *= gamma
+        newV += R
+        delta = np.abs(newV - V).max()
+        V = newV
+        if delta < tol:
+            break
+    return V
+
+def _improve(model, Q, actions, tol:float):
+    """
+    Greedy improvement of actions from Q, ties within tol keep the actual
+    action. Returns the new actions and the best value per state.
+    """
+    best = Q.max(axis=1)
+    actual = model.selectActions(Q, actions)
+    change = np.flatnonzero(actual < best - tol)
+    newActions = actions.copy()
+    newActions[change] = Q[change].argmax(axis=1)
+    return newActions, best
+
+def _output(model, V, actions, residuals):
+    pi = model.toGrid(actions.astype(UINT_DEFT) + model.minAction)
+    return model.toGrid(V), pi, residuals
+
+def valueIteration(env, gamma:float = 0.99, tol:float = 1e-6, maxIters:int = 10**4):
+    """
+    Value iteration.
+
+    Parameters
+    ----------
+    env: gridWorld or gridModel
+        Environment or its model from env.getModel()
+    gamma: float
+        Default 0.99. Discount factor.
+    tol: float
+        Default 1e-6. Stops when the residual is below this value.
+    maxIters: int
+        Default 10**4. Maximum number of iterations.
+
+    Returns
+    -------
+    V, pi, residuals
+    """
+    model = _getModel(env)
+    V = np.zeros(model.nStates)
+    residuals = []
+    for _ in range(maxIters):
+        Q = _Q(model, V, gamma)
+        newV = Q.max(axis=1)
+        residuals += [float(np.abs(newV - V).max())]
+        V = newV
+        if residuals[-1] < tol:
+            break
+    actions = _Q(model, V, gamma).argmax(axis=1)
+    return _output(model, V, actions, residuals)
+
+def modifiedPolicyIteration(env, gamma:float = 0.99, sweeps:int = 20, tol:float = 1e-6, maxIters:int = 10**4):
+    """
+    Modified policy iteration. Each policy is evaluated with a fixed
+    number of sweeps before the greedy improvement.
+
+    Parameters
+    ----------
+    env: gridWorld or gridModel
+        Environment or its model from env.getModel()
+    gamma: float
+        Default 0.99. Discount factor.
+    sweeps: int
+        Default 20. Number of evaluation sweeps per iteration.
+    tol: float
+        Default 1e-6. Stops when the residual is below this value.
+    maxIters: int
+        Default 10**4. Maximum number of iterations.
+
+    Returns
+    -------
+    V, pi, residuals
+    """
+    model = _getModel(env)
+    V = np.zeros(model.nStates)
+    actions = np.zeros(model.nStates, dtype=np.intp)
+    residuals = []
+    for _ in range(maxIters):
+        Q = _Q(model, V, gamma)
+        newActions, best = _improve(model, Q, actions, tol)
+        residuals += [float(np.abs(best - V).max())]
+        if residuals[-1] < tol and (newActions == actions).all():
+            break
+        actions = newActions
+        V = _evaluate(model, actions, V, gamma, sweeps, tol)
+    return _output(model, V, actions, residuals)
+
+def policyIteration(env, gamma:float = 0.99, tol:float = 1e-6, maxIters:int = 10**3, maxSweeps:int = 10**5):
+    """
+    Policy iteration. Each policy is evaluated until the change of the
+    values is below tol, then improved until it remains the same.
+
+    Parameters
+    ----------
+    env: gridWorld or gridModel
+        Environment or its model from env.getModel()
+    gamma: float
+        Default 0.99. Discount factor.
+    tol: float
+        Default 1e-6. Tolerance for the policy evaluation.
+    maxIters: int
+        Default 10**3. Maximum number of improvements.
+    maxSweeps: int
+        Default 10**5. Maximum number of sweeps per evaluation.
+
+    Returns
+    -------
+    V, pi, residuals
+    """
+    model = _getModel(env)
+    V = np.zeros(model.nStates)
+    actions = np.zeros(model.nStates, dtype=np.intp)
+    residuals = []
+    for _ in range(maxIters):
+        V = _evaluate(model, actions, V, gamma, maxSweeps, tol)
+        Q = _Q(model, V, gamma)
+        newActions, best = _improve(model, Q, actions, tol)
+        residuals += [float(np.abs(best - V).max())]
+        if (newActions == actions).all():
+            break
+        actions = newActions
+    return _output(model, V, actions, residuals)
@@ -1 +1,3 @@
-from RL_Toy.base.basics import Environment, Policy, ActionSpace, ObservationSpace, Agent, AgentToy
\ No newline at end of file
+from RL_Toy.base.basics import Environment, Policy, ActionSpace, ObservationSpace, Agent, AgentToy
+from RL_Toy.base.rng import getRNG, globalRNG, bufferedRNG
+from RL_Toy.base.profiler import phaseProfiler
\ No newline at end of file
@@ -1,4 +1,6 @@
 from RL_Toy.base.const import *
+from RL_Toy.base.rng import getRNG, bufferedRNG
+from RL_Toy.base.profiler import phaseProfiler
 
 class ActionSpace(ABC):
     """
@@ -14,11 +16,15 @@ class ActionSpace(ABC):
         Default 0. The minimum value that the action can take. It's
         the lower inclusive of the action space intervals 
         [minValue, minValue + n)
+    rng: int, np.random.Generator or bufferedRNG
+        Default None. Generator or seed for the samples. If None the
+        global np.random state is used.
     """
-    def __init__(self, n:int, minValue:int=0):
+    def __init__(self, n:int, minValue:int=0, rng = None):
         assert n > 0, "Number of actions must be greater than 0"
         self.n = n
         self.mV = minValue
+        self.rng = getRNG(rng)
     
     @property
     def shape(self):
@@ -41,12 +47,12 @@ class ActionSpace(ABC):
     def __len__(self):
         return self.n
 
-    def sample(self):
+    def sample(self, n:int = None):
         """
         Returns a random sample with an uniform distribution of the
-        actions.
+        actions. If n is given returns an array with n samples.
         """
-        return np.random.randint(self.mV, self.mV + self.n)
+        return self.rng.integers(self.mV, self.mV + self.n, size=n)
 
 
 class Environment(ABC):
@@ -112,6 +118,20 @@ class Environment(ABC):
         or not.
         """
         raise NotImplementedError
+    def enableProfiling(self, profiler:phaseProfiler = None):
+        """
+        Times the calls to step and reset until disableProfiling
+        is called. Returns the phaseProfiler with the records.
+        """
+        profiler = profiler if profiler is not None else phaseProfiler()
+        profiler.attach(self, {"step": "env.step", "reset": "env.reset"})
+        self.profiler = profiler
+        return profiler
+    def disableProfiling(self):
+        profiler = getattr(self, "profiler", None)
+        if profiler is not None:
+            profiler.detach()
+            self.profiler = None
 
 class Policy(ABC):
     """
@@ -163,11 +183,15 @@ class ObservationSpace(ABC):
         Default 0. The minimum value that a cell's state can take. It's
         the lower inclusive of the action space intervals 
         [minValue, minValue + n)
+    rng: int, np.random.Generator or bufferedRNG
+        Default None. Generator or seed for the samples. If None the
+        environment's rng or the global np.random state is used.
     """
-    def __init__(self, env:Environment, minValue:int = 0):
+    def __init__(self, env:Environment, minValue:int = 0, rng = None):
         self.env = env
         self._n_ = env.shape
         self.mV = minValue
+        self.rng = getRNG(rng if rng is not None else getattr(env, "rng", None))
 
     def __iter__(self):
         self._i_ = []
@@ -228,6 +252,20 @@ class ObservationSpace(ABC):
     def shape(self):
         return self._n_
 
+    def toArray(self):
+        """
+        Returns all the valid states as an integer array of shape 
+        (S, len(shape)) in row-major order. Uses the cached 
+        env.stateArray if the environment has it.
+        """
+        stateArray = getattr(self.env, "stateArray", None)
+        if stateArray is not None:
+            return stateArray
+        sizes = [abs(i - self.mV) for i in self._n_]
+        states = np.indices(sizes).reshape(len(sizes), -1).T + self.mV
+        valid = [self.env.isValid(s) for s in map(tuple, states.tolist())]
+        return states[np.array(valid, dtype=np.bool_)]
+
     def sample(self):
         """
         Returns a random sample with an uniform distribution of the
@@ -235,7 +273,7 @@ class ObservationSpace(ABC):
         """
         newState = []
         for i in self._n_:
-            newState += [np.random.randint(self.mV, self.mV + i)]
+            newState += [self.rng.integers(self.mV, self.mV + i)]
         return newState
         
 class Agent:
@@ -318,17 +356,40 @@ class Agent:
         """
         Execute a test on the environment with 
         the actual policy
+
+        kwargs
+        ------
+        n_test: int
+            Default 10. Number of episodes to run.
+        workers: int
+            Default 1. If greater than 1 the episodes are split over a
+            pool of processes. The agent and the environment must be
+            picklable. The episodes on the workers are not profiled.
+        seed: int
+            Default None. Seed to generate an independent seed per worker.
+            Only used with workers.
         """
         self.testMode(True)
-        pi = self.policy
+        try:
+            if self.env_test is None:
+                env = self.env
+                self.done = True
+            else:
+                env = self.env_test
 
-        if self.env_test is None:
-            env = self.env
-            self.done = True
-        else:
-            env = self.env_test
+            n_test = kwargs.get("n_test", 10)
+            workers = min(kwargs.get("workers", 1), n_test)
+            if workers > 1:
+                tests_results, tests_steps = self._testParallel(env, n_test, workers, kwargs.get("seed"))
+            else:
+                tests_results, tests_steps = self._testEpisodes(env, n_test)
+        finally:
+            self.testMode(False)
 
-        n_test = kwargs.get("n_test", 10)
+        return tests_results, tests_steps
+
+    def _testEpisodes(self, env, n_test:int):
+        pi = self.policy
         tests_results, tests_steps = [], []
         for i in range(n_test):
             done = False
@@ -337,14 +398,40 @@ class Agent:
             while not done:
                 state = self.processObs(obs)
                 ar = pi.getAction(state)
-                obs, reward, done, _ = env.step(self.processAction(ar))
+                obs, reward, done = self._testStep(env, self.processAction(ar))
                 test_return += reward
                 test_steps += 1
             tests_results += [test_return]
             tests_steps += [test_steps]
+        return tests_results, tests_steps
 
-        self.testMode(False)
+    def _testStep(self, env, action):
+        obs, reward, done, _ = env.step(action)
+        return obs, reward, done
 
+    def _testParallel(self, env, n_test:int, workers:int, seed = None):
+        from concurrent.futures import ProcessPoolExecutor
+        seeds = [int(s.generate_state(1)[0]) for s in np.random.SeedSequence(seed).spawn(workers)]
+        chunks = [n_test // workers + (1 if i < n_test % workers else 0) for i in range(workers)]
+        tests_results, tests_steps = [], []
+        # The timed methods of the profilers can not be pickled, they are
+        # detached while the agent is sent and the workers are not timed
+        profiled = []
+        for obj in (self, self.env, env):
+            profiler = getattr(obj, "profiler", None)
+            if (profiler is not None) and all(obj is not o for o, _ in profiled):
+                obj.disableProfiling()
+                profiled += [(obj, profiler)]
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(_testWorker, self, env, n, s) for n, s in zip(chunks, seeds)]
+                for future in futures:
+                    results, steps = future.result()
+                    tests_results += results
+                    tests_steps += steps
+        finally:
+            for obj, profiler in reversed(profiled):
+                obj.enableProfiling(profiler)
         return tests_results, tests_steps
 
     def update(self, obs, action):
@@ -364,6 +451,36 @@ class Agent:
         state = self.processObs(obs)
         return self.policy.getAction(state)
         
+    def enableProfiling(self, profiler:phaseProfiler = None):
+        """
+        Times each phase of the step: processObs, policy.getAction,
+        processAction, env.step and processReward, and the whole
+        step. The methods are only wrapped until disableProfiling is
+        called, so there is no cost while disabled.
+
+        Returns
+        -------
+        phaseProfiler
+            Use its summary or report methods to read the results.
+        """
+        profiler = profiler if profiler is not None else phaseProfiler()
+        profiler.attach(self, {"step": "agent.step", "processObs": "processObs",
+                               "processAction": "processAction", "processReward": "processReward"})
+        profiler.attach(self.policy, {"getAction": "policy.getAction"})
+        envs = [self.env]
+        if (self.env_test is not None) and (self.env_test is not self.env):
+            envs += [self.env_test]
+        for env in envs:
+            profiler.attach(env, {"step": "env.step", "reset": "env.reset"})
+        self.profiler = profiler
+        return profiler
+
+    def disableProfiling(self):
+        profiler = getattr(self, "profiler", None)
+        if profiler is not None:
+            profiler.detach()
+            self.profiler = None
+
     def testMode(self, mode : bool = True):
         """
         If the policy supports it, its changed to 
@@ -412,36 +529,21 @@ class AgentToy(Agent):
 
         return state, action, reward, self.episodeSteps, done 
     
-    def test(self, **kwargs):
-        """
-        Execute a test on the environment with 
-        the actual policy
-        """
-        self.testMode(True)
-        pi = self.policy
+    def _testStep(self, env, action):
+        return env.step(action)
 
-        if self.env_test is None:
-            env = self.env
-            self.done = True
-        else:
-            env = self.env_test
-
-        n_test = kwargs.get("n_test", 10)
-        tests_results, tests_steps = [], []
-        for i in range(n_test):
-            done = False
-            obs = env.reset()
-            test_return, test_steps = 0.0, 0
-            while not done:
-                state = self.processObs(obs)
-                ar = pi.getAction(state)
-                obs, reward, done = env.step(self.processAction(ar))
-                test_return += reward
-                test_steps += 1
-            tests_results += [test_return]
-            tests_steps += [test_steps]
-
-        self.testMode(False)
-
-        return tests_results, tests_steps
-    
\ No newline at end of file
+def _testWorker(agent:Agent, env, n_test:int, seed:int):
+    """
+    Runs the test episodes of agent on a worker process with its own seed.
+    """
+    # Independent streams for the global state, the env and the policy
+    globalSeed, envSeed, policySeed = np.random.SeedSequence(seed).spawn(3)
+    np.random.seed(globalSeed.generate_state(1))
+    if callable(getattr(env, "seed", None)):
+        env.seed(int(envSeed.generate_state(1)[0]))
+    for obj, child in ((env, envSeed), (agent.policy, policySeed)):
+        rng = getattr(obj, "rng", None)
+        if isinstance(rng, bufferedRNG):
+            rng.seed(child)
+    agent.testMode(True)
+    return agent._testEpisodes(env, n_test)
@@ -6,7 +6,6 @@
 
 ### Imports
 
-import matplotlib.pyplot as plt
 import numpy as np
 from abc import ABC
 from math import ceil, floor, exp
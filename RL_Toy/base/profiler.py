@@ -0,0 +1,104 @@
+"""
+    Opt-in timing of the phases of an agent and its environment.
+
+    Methods are wrapped on the instances only while profiling is enabled,
+    so the classes run without any extra cost otherwise.
+"""
+import time
+
+class phaseProfiler():
+    """
+    Counters, total time and a histogram of times per phase. The bin
+    i of the histogram counts the calls that took [2**(i-1), 2**i)
+    nanoseconds.
+    """
+    NBINS = 48
+
+    def __init__(self):
+        self.phases = dict()
+        self._wrapped = []
+
+    def record(self, phase:str, ns:int):
+        stats = self.phases.get(phase)
+        if stats is None:
+            stats = self.phases[phase] = [0, 0, ns, ns, [0] * self.NBINS]
+        stats[0] += 1
+        stats[1] += ns
+        if ns < stats[2]:
+            stats[2] = ns
+        if ns > stats[3]:
+            stats[3] = ns
+        stats[4][min(ns.bit_length(), self.NBINS - 1)] += 1
+
+    def wrap(self, phase:str, function):
+        """
+        Returns function timed under phase.
+        """
+        clock, record = time.perf_counter_ns, self.record
+        def timed(*args, **kwargs):
+            start = clock()
+            result = function(*args, **kwargs)
+            record(phase, clock() - start)
+            return result
+        return timed
+
+    def attach(self, obj, methods:dict):
+        """
+        Replaces the methods of obj by their timed versions. methods
+        is a dictionary from the method name to the phase name.
+        """
+        for name, phase in methods.items():
+            function = getattr(obj, name, None)
+            if function is None:
+                continue
+            previous = obj.__dict__.get(name) if hasattr(obj, "__dict__") else None
+            setattr(obj, name, self.wrap(phase, function))
+            self._wrapped += [(obj, name, previous)]
+
+    def detach(self):
+        """
+        Restores all the methods wrapped with attach.
+        """
+        for obj, name, previous in reversed(self._wrapped):
+            if previous is None:
+                delattr(obj, name)
+            else:
+                setattr(obj, name, previous)
+        self._wrapped = []
+
+    def clear(self):
+        self.phases = dict()
+
+    def _percentile(self, histogram, count:int, q:float):
+        # Upper limit of the bin that reaches the quantile
+        target, acc = q * count, 0
+        for i, c in enumerate(histogram):
+            acc += c
+            if acc >= target:
+                return 2 ** i
+        return 2 ** (len(histogram) - 1)
+
+    def summary(self):
+        """
+        Returns a dictionary per phase with calls, total, mean, min, max
+        and the approximated p50 and p99, times in seconds.
+        """
+        out = dict()
+        for phase, (count, total, low, high, histogram) in self.phases.items():
+            out[phase] = {"calls": count, "total": total * 1e-9, "mean": total / count * 1e-9,
+                          "min": low * 1e-9, "max": high * 1e-9,
+                          "p50": self._percentile(histogram, count, 0.5) * 1e-9,
+                          "p99": self._percentile(histogram, count, 0.99) * 1e-9}
+        return out
+
+    def report(self) -> str:
+        """
+        Returns the summary as a table sorted by total time.
+        """
+        lines = ["{:<20} {:>10} {:>10} {:>10} {:>10} {:>10}".format(
+            "phase", "calls", "total s", "mean us", "p50 us", "p99 us")]
+        summary = sorted(self.summary().items(), key=lambda x: -x[1]["total"])
+        for phase, s in summary:
+            lines += ["{:<20} {:>10} {:>10.4f} {:>10.2f} {:>10.2f} {:>10.2f}".format(
+                phase, s["calls"], s["total"], s["mean"] * 1e6, s["p50"] * 1e6, s["p99"] * 1e6)]
+        return "\n".join(lines)
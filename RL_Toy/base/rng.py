@@ -0,0 +1,93 @@
+"""
+    Random number generators for the environments and policies.
+
+    globalRNG forwards to the global state of np.random, which is the
+    default behavior. bufferedRNG is built on a np.random.Generator and
+    draws blocks of numbers at once to serve single samples from buffers.
+"""
+import numpy as np
+
+class globalRNG():
+    """
+    Forwards the calls to the global np.random state.
+    """
+    def random(self, size = None):
+        """
+        Uniform floats in [0, 1)
+        """
+        return np.random.uniform(size=size)
+
+    def integers(self, low:int, high:int, size = None):
+        """
+        Uniform integers in [low, high)
+        """
+        return np.random.randint(low, high, size=size)
+
+class bufferedRNG():
+    """
+    Generator with refillable buffers for single samples.
+
+    Parameters
+    ----------
+    seed: int, SeedSequence or np.random.Generator
+        Default None. Seed or generator to use. If None a fresh
+        generator is created from the OS entropy.
+    bufferSize: int
+        Default 4096. Number of samples drawn per refill.
+    """
+    def __init__(self, seed = None, bufferSize:int = 4096):
+        assert bufferSize > 0, "Buffer size must be positive"
+        self.bufferSize = bufferSize
+        self.seed(seed)
+
+    def seed(self, seed = None):
+        """
+        Restarts the generator with a new seed and empties the buffers.
+        """
+        if isinstance(seed, np.random.Generator):
+            self.generator = seed
+        else:
+            self.generator = np.random.default_rng(seed)
+        self._floats, self._fi = [], 0
+        self._ints = dict()
+
+    def random(self, size = None):
+        """
+        Uniform floats in [0, 1)
+        """
+        if size is not None:
+            return self.generator.random(size)
+        if self._fi >= len(self._floats):
+            self._floats, self._fi = self.generator.random(self.bufferSize).tolist(), 0
+        x = self._floats[self._fi]
+        self._fi += 1
+        return x
+
+    def integers(self, low:int, high:int, size = None):
+        """
+        Uniform integers in [low, high)
+        """
+        if size is not None:
+            return self.generator.integers(low, high, size)
+        buffer = self._ints.get((low, high))
+        if (buffer is None) or (buffer[1] >= len(buffer[0])):
+            buffer = [self.generator.integers(low, high, self.bufferSize).tolist(), 0]
+            self._ints[(low, high)] = buffer
+        x = buffer[0][buffer[1]]
+        buffer[1] += 1
+        return x
+
+GLOBAL_RNG = globalRNG()
+
+def getRNG(rng = None):
+    """
+    Returns the generator to use from the argument rng. None means the
+    global np.random state, a seed or a np.random.Generator are wrapped
+    in a bufferedRNG and generators from this module are returned as they
+    are.
+    """
+    if rng is None:
+        return GLOBAL_RNG
+    if isinstance(rng, (globalRNG, bufferedRNG)):
+        return rng
+    return bufferedRNG(rng)
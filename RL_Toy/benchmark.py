@@ -0,0 +1,260 @@
+"""
+    Benchmark suite for RL_Toy.
+
+    Measures the throughput of the environments, policies and value
+    functions, the time to render a frame and the peak memory of each
+    case. Results are written as JSON and can be compared against a
+    baseline file to flag regressions.
+
+    Usage
+    -----
+    python -m RL_Toy.benchmark --output bench.json --baseline baseline.json
+
+    The exit code is 1 when a regression is found.
+"""
+import argparse
+import gc
+import json
+import platform
+import time
+import tracemalloc
+from RL_Toy.base.const import *
+
+BENCHMARKS = dict()
+
+def benchmark(name:str, unit:str):
+    """
+    Decorator to register a benchmark. The function receives the quick
+    flag and returns a list of (case, setup, run, n) where setup(n)
+    prepares, out of the timing, the data of n operations and run(data)
+    runs them.
+    """
+    def register(f):
+        BENCHMARKS[name] = (f, unit)
+        return f
+    return register
+
+def measure(setup, run, n:int, repeats:int = 5, memoryN:int = None):
+    """
+    Returns the best operations per second of repeats calls of run on
+    the data of setup(n), after a warm up call, and the peak of memory
+    allocated in bytes by run on setup(memoryN) traced apart. Only run
+    is timed, with the garbage collector off as in timeit.
+    """
+    memoryN = memoryN if memoryN is not None else max(1, n // 10)
+    run(setup(memoryN))
+    best = float("inf")
+    for _ in range(max(1, repeats)):
+        data = setup(n)
+        gcOn = gc.isenabled()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            run(data)
+            best = min(best, time.perf_counter() - start)
+        finally:
+            if gcOn:
+                gc.enable()
+    data = setup(memoryN)
+    tracemalloc.start()
+    run(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return n / max(best, 1e-12), peak
+
+def _size(n):
+    # Setup of the cases without data
+    return n
+
+def _stepsCase(env):
+    nA = len(env.actionSpace)
+    def setup(n):
+        env.reset()
+        return np.random.randint(1, nA + 1, size=n).tolist()
+    def run(actions):
+        for a in actions:
+            _, _, done = env.step(a)
+            if done:
+                env.reset()
+    return setup, run
+
+@benchmark("gridWorld.step", "steps/s")
+def benchGridWorld(quick:bool):
+    from RL_Toy.envs import gridWorld
+    cases = []
+    for size in ((10, 50) if quick else (10, 50, 200, 1000)):
+        env = gridWorld(size, size, (0, 0), (size - 1, size - 1), horizon=10**9)
+        cases += [("{0}x{0}".format(size), *_stepsCase(env), 20000)]
+    return cases
+
+@benchmark("stochasticGridWorld.step", "steps/s")
+def benchStochasticGridWorld(quick:bool):
+    from RL_Toy.envs import stochasticGridWorld
+    cases = []
+    size = 100
+    for nVortex in ((0, 100) if quick else (0, 10, 100, 1000)):
+        env = stochasticGridWorld(size, size, (size // 2, size // 2), (size - 1, size - 1), horizon=10**9)
+        rng = np.random.default_rng(0)
+        env.addVortex(*[(int(x), int(y), 0.01) for x, y in rng.integers(0, size, (nVortex, 2))])
+        env.reset()
+        cases += [("{0}x{0} vortex {1}".format(size, nVortex), *_stepsCase(env), 20000)]
+    return cases
+
+@benchmark("gridWorld.step maze", "steps/s")
+def benchGridWorldMaze(quick:bool):
+    from RL_Toy.envs import generateEnvs
+    cases = []
+    for size in ((65, 257) if quick else (65, 257, 1025)):
+        env = generateEnvs("maze", 1, size, size, seed=0, envKwargs={"horizon": 10**9})[0]
+        cases += [("{0}x{0}".format(size), *_stepsCase(env), 20000)]
+    return cases
+
+@benchmark("generators", "layouts/s")
+def benchGenerators(quick:bool):
+    from RL_Toy.envs import GENERATORS
+    cases = []
+    for kind, generator in GENERATORS.items():
+        sizes = (64, 256) if quick else (64, 256, 1024, 2048 if kind == "maze" else 4096)
+        for size in sizes:
+            def run(n, generator = generator, size = size):
+                for i in range(n):
+                    generator(size, size, rng=i)
+            cases += [("{0} {1}x{1}".format(kind, size), _size, run, max(1, 2**16 // size**2 * 10))]
+    return cases
+
+@benchmark("gridPolicyEpsilon.getAction", "actions/s")
+def benchGridPolicy(quick:bool):
+    from RL_Toy.envs import gridWorld
+    from RL_Toy.policies import gridPolicyEpsilon
+    env = gridWorld(50, 50, (0, 0), (49, 49))
+    policy = gridPolicyEpsilon(env, 0.1)
+    def setup(n):
+        return list(map(tuple, np.random.randint(0, 50, size=(n, 2)).tolist()))
+    def run(states):
+        for s in states:
+            policy.getAction(s)
+    return [("50x50", setup, run, 50000)]
+
+@benchmark("gymPolicyDiscreteFromCon.getAction", "actions/s")
+def benchGymPolicy(quick:bool):
+    try:
+        from gym.spaces import Box, Discrete
+    except ImportError:
+        return []
+    from RL_Toy.policies import gymPolicyDiscreteFromCon
+    class boxEnv:
+        observation_space = Box(-1, 1, (4,), dtype=np.float32)
+        action_space = Discrete(3)
+    policy = gymPolicyDiscreteFromCon(boxEnv(), [0.01] * 4, epsilon=0.1)
+    def setup(n):
+        return np.random.uniform(-1, 1, size=(n, 4))
+    def run(observations):
+        for obs in observations:
+            policy.getAction(obs)
+    def runBatch(observations):
+        policy.getActions(observations)
+    return [("4D single", setup, run, 20000), ("4D batch", setup, runBatch, 200000)]
+
+@benchmark("Q_function", "ops/s")
+def benchQFunction(quick:bool):
+    from RL_Toy.utils import Q_function
+    Q = Q_function()
+    def pairs(n):
+        return [((x, y), a) for x, y, a in np.random.randint(0, 50, size=(n, 3)).tolist()]
+    def runSet(data):
+        for p in data:
+            Q[p] = 1.0
+    def runGet(data):
+        for p in data:
+            Q[p]
+    def runMax(data):
+        for s, _ in data:
+            Q.maxAction(s)
+    return [("set", pairs, runSet, 50000), ("get", pairs, runGet, 50000),
+            ("maxAction", pairs, runMax, 50000)]
+
+@benchmark("gridWorld.render", "frames/s")
+def benchRender(quick:bool):
+    from RL_Toy.envs import gridWorld
+    env = gridWorld(50, 50, (0, 0), (49, 49), horizon=10**9)
+    env.addObstacles(*[(i, 25) for i in range(40)])
+    def setup(n):
+        env.reset()
+        return np.random.randint(1, 6, size=n).tolist()
+    def run(actions):
+        for a in actions:
+            env.render(mode="rgb_array")
+            env.step(a)
+    return [("50x50 rgb_array", setup, run, 2000)]
+
+def runBenchmarks(names = None, quick:bool = False, verbose:bool = True, repeats:int = 5):
+    """
+    Runs the registered benchmarks, or only the ones in names, keeping
+    the best of repeats timings of each case.
+
+    Returns
+    -------
+    dict with the results per "benchmark/case"
+    """
+    results = dict()
+    for name, (function, unit) in BENCHMARKS.items():
+        if (names is not None) and (name not in names):
+            continue
+        for case, setup, run, n in function(quick):
+            if quick:
+                n = max(1, n // 10)
+            rate, peak = measure(setup, run, n, repeats)
+            key = "{}/{}".format(name, case)
+            results[key] = {"rate": rate, "unit": unit, "peakMemory": peak}
+            if verbose:
+                print("{:<60} {:>14.1f} {:<10} {:>10.1f} KiB".format(key, rate, unit, peak / 1024))
+    return results
+
+def compare(results:dict, baseline:dict, tolerance:float = 0.2):
+    """
+    Returns the list of regressions of results against the baseline. A
+    regression is a rate lower or a peak memory higher than the baseline
+    by more than the tolerance fraction.
+    """
+    regressions = []
+    for key, base in baseline.items():
+        new = results.get(key)
+        if new is None:
+            continue
+        if new["rate"] < base["rate"] * (1 - tolerance):
+            regressions += ["{} rate {:.1f} < {:.1f} {}".format(key, new["rate"], base["rate"], new["unit"])]
+        if new["peakMemory"] > base["peakMemory"] * (1 + tolerance):
+            regressions += ["{} peak memory {} > {} bytes".format(key, new["peakMemory"], base["peakMemory"])]
+    return regressions
+
+def main(args = None):
+    parser = argparse.ArgumentParser(description="RL_Toy benchmark suite")
+    parser.add_argument("--output", default="bench.json", help="JSON file to write the results")
+    parser.add_argument("--baseline", default=None, help="JSON file with results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed fraction of change")
+    parser.add_argument("--only", nargs="*", default=None, help="Names of the benchmarks to run")
+    parser.add_argument("--quick", action="store_true", help="Smaller cases and iterations")
+    parser.add_argument("--repeats", type=int, default=5, help="Timings per case, the best is kept")
+    args = parser.parse_args(args)
+
+    results = runBenchmarks(args.only, args.quick, repeats=args.repeats)
+    report = {"meta": {"python": platform.python_version(), "numpy": np.__version__,
+                       "machine": platform.machine(), "quick": args.quick,
+                       "repeats": args.repeats,
+                       "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime())},
+              "results": results}
+    with open(args.output, "w") as file_:
+        json.dump(report, file_, indent=2)
+
+    if args.baseline is not None:
+        with open(args.baseline) as file_:
+            baseline = json.load(file_)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        for r in regressions:
+            print("REGRESSION", r)
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
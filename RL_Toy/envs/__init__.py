@@ -1 +1,4 @@
-from RL_Toy.envs.grids import gridWorld, stochasticGridWorld
\ No newline at end of file
+from RL_Toy.envs.grids import gridWorld, stochasticGridWorld
+from RL_Toy.envs.vector import VecGridWorld, VecStochasticGridWorld
+from RL_Toy.envs.generators import GENERATORS, randomLayout, mazeLayout, roomsLayout, reachableCells, \
+    generateLayouts, generateEnvs
@@ -0,0 +1,207 @@
+"""
+    Seeded procedural layouts for gridWorld.
+
+    Each generator returns (layout, start, goal) where layout is an array
+    of shape (width, height) with the codes of gridWorld.layout and the
+    goal is always reachable from the start moving on 4 directions without
+    crossing obstacles or vortex. The layouts are built with
+    gridWorld.fromArray.
+"""
+from itertools import permutations
+from RL_Toy.base.const import *
+from RL_Toy.base.rng import getRNG
+from RL_Toy.envs.grids import gridWorld
+
+EMPTY, GOAL, OBST, VORTEX = 0, gridWorld.GOAL, gridWorld.OBST, gridWorld.VORTEX
+
+def reachableCells(layout, start:tuple):
+    """
+    Returns a boolean array with the shape of layout with the cells that
+    can be reached from start without crossing obstacles or vortex.
+    """
+    width, height = layout.shape
+    free = ((layout != OBST) & (layout != VORTEX)).ravel()
+    reached = np.zeros(width * height, dtype=np.bool_)
+    first = start[0] * height + start[1]
+    reached[first] = True
+    frontier = np.array([first], dtype=np.intp)
+    # Breadth first by layers, each one with array operations
+    while len(frontier) > 0:
+        y = frontier % height
+        nb = np.concatenate((frontier - height, frontier + height,
+                             frontier[y > 0] - 1, frontier[y < height - 1] + 1))
+        nb = nb[(nb >= 0) & (nb < width * height)]
+        nb = nb[free[nb] & ~reached[nb]]
+        reached[nb] = True
+        frontier = np.unique(nb)
+    return reached.reshape(width, height)
+
+def randomLayout(width:int, height:int, density:float = 0.3, vortexDensity:float = 0.0,
+                 start:tuple = (0, 0), rng = None):
+    """
+    Obstacles and vortex placed independently on each cell with the given
+    densities. The goal is a random cell reachable from start, if there
+    is none a corridor is opened from the start to the goal.
+
+    Returns
+    -------
+    layout, start, goal
+    """
+    rng = getRNG(rng)
+    throw = rng.random(size=(width, height))
+    layout = np.zeros((width, height), dtype=np.uint8)
+    layout[throw < density] = OBST
+    layout[(throw >= density) & (throw < density + vortexDensity)] = VORTEX
+    layout[start] = EMPTY
+    reached = reachableCells(layout, start)
+    reached[start] = False
+    cells = np.flatnonzero(reached)
+    if len(cells) > 0:
+        goal = divmod(int(cells[rng.integers(0, len(cells))]), height)
+    else:
+        goal = (width - 1 - start[0], height - 1 - start[1])
+        _carveCorridor(layout, start, goal)
+    layout[goal] = GOAL
+    return layout, tuple(start), goal
+
+def mazeLayout(width:int, height:int, rng = None):
+    """
+    Perfect maze from an iterative recursive backtracker. The cells of the
+    maze are on the even positions and the walls between them are opened
+    as the search advances. The start is (0, 0) and the goal the farthest
+    corner of the maze.
+
+    Returns
+    -------
+    layout, start, goal
+    """
+    rng = getRNG(rng)
+    cw, ch = (width + 1) // 2, (height + 1) // 2
+    n = cw * ch
+    orders = list(permutations(range(4)))
+    order = rng.integers(0, len(orders), size=n).tolist()
+    deltas = (-ch, ch, -1, 1)
+    visited = bytearray(n)
+    tried = bytearray(n)
+    parents, children = [], []
+    stack = [0]
+    visited[0] = 1
+    while stack:
+        c = stack[-1]
+        p = tried[c]
+        if p == 4:
+            stack.pop()
+            continue
+        tried[c] = p + 1
+        d = orders[order[c]][p]
+        if d == 0:
+            inside = c >= ch
+        elif d == 1:
+            inside = c < n - ch
+        elif d == 2:
+            inside = c % ch != 0
+        else:
+            inside = c % ch != ch - 1
+        if inside:
+            nb = c + deltas[d]
+            if not visited[nb]:
+                visited[nb] = 1
+                parents.append(c)
+                children.append(nb)
+                stack.append(nb)
+    layout = np.full((width, height), OBST, dtype=np.uint8)
+    layout[0::2, 0::2] = EMPTY
+    if len(parents) > 0:
+        parents, children = np.array(parents), np.array(children)
+        # The wall is between both cells
+        layout[parents // ch + children // ch, parents % ch + children % ch] = EMPTY
+    goal = (2 * (cw - 1), 2 * (ch - 1))
+    layout[goal] = GOAL
+    return layout, (0, 0), goal
+
+def roomsLayout(width:int, height:int, nRooms:int = None, minSize:int = 3, maxSize:int = None,
+                rng = None):
+    """
+    Rectangular rooms joined in sequence by L shaped corridors. The rooms
+    are ordered in bands to keep the corridors short. The start is the
+    center of the first room and the goal the center of the last one.
+
+    Parameters
+    ----------
+    nRooms: int
+        Default enough rooms to cover about a quarter of the grid, at
+        least 2.
+    minSize, maxSize: int
+        Limits of the sides of the rooms. Default maxSize is 12 or a
+        quarter of the shortest side if smaller, at least minSize.
+
+    Returns
+    -------
+    layout, start, goal
+    """
+    rng = getRNG(rng)
+    maxSize = max(minSize, min(12, min(width, height) // 4)) if maxSize is None else maxSize
+    nRooms = max(2, width * height // (2 * maxSize) ** 2) if nRooms is None else nRooms
+    sx = np.minimum(rng.integers(minSize, maxSize + 1, size=nRooms), width)
+    sy = np.minimum(rng.integers(minSize, maxSize + 1, size=nRooms), height)
+    x0 = (rng.random(size=nRooms) * (width - sx + 1)).astype(np.intp)
+    y0 = (rng.random(size=nRooms) * (height - sy + 1)).astype(np.intp)
+    cx, cy = x0 + sx // 2, y0 + sy // 2
+    band = cx // (2 * maxSize)
+    order = np.lexsort((np.where(band % 2 == 0, cy, -cy), band))
+    layout = np.full((width, height), OBST, dtype=np.uint8)
+    for i in range(nRooms):
+        layout[x0[i]:x0[i] + sx[i], y0[i]:y0[i] + sy[i]] = EMPTY
+    centers = np.stack((cx[order], cy[order]), axis=1).tolist()
+    for a, b in zip(centers[:-1], centers[1:]):
+        _carveCorridor(layout, a, b)
+    start, goal = tuple(centers[0]), tuple(centers[-1])
+    if start == goal:
+        goal = divmod(int(np.flatnonzero(layout != OBST)[-1]), height)
+    layout[goal] = GOAL
+    return layout, start, goal
+
+def _carveCorridor(layout, a, b):
+    # Along x on the column of a, then along y on the row of b
+    (xa, ya), (xb, yb) = a, b
+    layout[min(xa, xb):max(xa, xb) + 1, ya] = EMPTY
+    layout[xb, min(ya, yb):max(ya, yb) + 1] = EMPTY
+
+GENERATORS = {"random": randomLayout, "maze": mazeLayout, "rooms": roomsLayout}
+
+def generateLayouts(kind:str, n:int, width:int, height:int, seed = None, **kwargs):
+    """
+    Generates n layouts of the same size, each with its own seed derived
+    from seed. kwargs are passed to the generator.
+
+    Returns
+    -------
+    layouts
+        Array of shape (n, width, height).
+    starts, goals
+        Arrays of shape (n, 2).
+    """
+    assert kind in GENERATORS, "kind must be one of {}".format(list(GENERATORS))
+    generator = GENERATORS[kind]
+    layouts = np.empty((n, width, height), dtype=np.uint8)
+    starts = np.empty((n, 2), dtype=INT_DEFT)
+    goals = np.empty((n, 2), dtype=INT_DEFT)
+    for i, child in enumerate(np.random.SeedSequence(seed).spawn(n)):
+        layouts[i], starts[i], goals[i] = generator(width, height, rng=np.random.default_rng(child), **kwargs)
+    return layouts, starts, goals
+
+def generateEnvs(kind:str, n:int, width:int, height:int, seed = None, envClass = gridWorld,
+                 vortexProb:float = None, envKwargs:dict = None, **kwargs):
+    """
+    Generates n environments of envClass from the layouts of
+    generateLayouts. envKwargs are passed to the constructor of the
+    environments.
+
+    Returns
+    -------
+    list of environments
+    """
+    envKwargs = dict() if envKwargs is None else envKwargs
+    layouts, starts, _ = generateLayouts(kind, n, width, height, seed, **kwargs)
+    return [envClass.fromArray(layout, tuple(start.tolist()), vortexProb, **envKwargs)
+            for layout, start in zip(layouts, starts)]
@@ -1,6 +1,11 @@
 from RL_Toy.base import  Environment, ActionSpace, ObservationSpace
+from RL_Toy.base.rng import getRNG
 from RL_Toy.base.const import *
-from RL_Toy.utils import Q_function
+from RL_Toy.utils import Q_function, Q_array
+from RL_Toy.envs.models import gridModel
+from array import array
+from pathlib import Path
+from typing import Union
 
 class gridWorld(Environment):
     """
@@ -21,6 +26,13 @@ class gridWorld(Environment):
     horizon: int
         Default 10**6. Number of steps to run the environment before it
         terminates.
+    rng: int, np.random.Generator or bufferedRNG
+        Default None. Generator or seed for the transitions and the
+        action space samples. If None the global np.random state is used.
+    obsMode: str
+        Default "dict". Observation returned by step and reset. "dict" is
+        {"agent": (x, y), "grid": grid}, "coords" the tuple (x, y) and 
+        "index" the integer of the state as in stateToIndex.
     """
     # All gfx related
     EMPTYC = (255, 255, 255)
@@ -34,6 +46,14 @@ class gridWorld(Environment):
     POLICYC = (0, 1, 0.5)
     CELLSIZE = 4
     GRAPHSCALE = 1.2    
+    # Largest side of the figure in inches and number of cells to label
+    MAXFIGSIZE = 16
+    TEXTLIMIT = 400
+    VALUECMAP = "viridis"
+    VALUEALPHA = 0.6
+
+    # Characters of the ASCII maps, S is the initial position
+    ASCII = {".": 0, " ": 0, "S": 0, "G": GOAL, "#": OBST, "V": VORTEX}
 
     VORTEXD = [[False, True, True, False],
              [True, False, False, True],
@@ -57,7 +77,16 @@ class gridWorld(Environment):
 
     actions4C = [1,3,4,5,7]
 
-    def __init__(self, width:int, height:int, initPos:tuple, goal:tuple, movement:str = "4C", horizon:int = 10**6):
+    # Step from the precomputed tables, only for deterministic dynamics and
+    # when transProb, validateAction and calculateReward are not overridden.
+    # Larger grids check each move inline instead of building the tables
+    tableStep = True
+    STEPTABLELIMIT = 2**22
+    # The table step draws from rng as the general step to give the same
+    # results. False skips the draw, faster but the later draws differ
+    sameDraws = True
+
+    def __init__(self, width:int, height:int, initPos:tuple, goal:tuple, movement:str = "4C", horizon:int = 10**6, rng = None, obsMode:str = "dict"):
         # Grid Related
         self.grid = np.zeros((width, height), dtype=np.uint8)
         self._w = width
@@ -65,18 +94,30 @@ class gridWorld(Environment):
         self.obstacles = []
         self.vortex = []
         self.goal = [goal]
+        self._bulkCells = {self.OBST: [], self.VORTEX: [], self.GOAL: []}
+        self._layoutVersion = 0
+        self._layoutCache = None
+        self._statesCache = None
+        self._stepCache = None
+        self._idCache = None
         self.steps = 0
         self.gameOver = False
         self.horizon = horizon
         # Agent related
+        assert obsMode in ("dict", "coords", "index"), "Observation mode must be dict, coords or index"
+        self.obsMode = obsMode
         self.movMode = movement
         self.validateTuple(initPos)
         self.initX, self.initY = initPos
         self.posX, self.posY = initPos
-        self.__actionSpace = ActionSpace(9 if movement == "8C" else 5, 1)
+        self.rng = getRNG(rng)
+        self._defaultDynamics = self._hasDefaultDynamics()
+        self.__actionSpace = ActionSpace(9 if movement == "8C" else 5, 1, self.rng)
         self._obsSpace = None
         # Graphics related
         self.frame = np.zeros((width * self.CELLSIZE, height * self.CELLSIZE, 3), dtype=np.uint8)
+        self._bgGrid = None
+        self._agentTile = None
         # Initialize the grid
         self.reset()
 
@@ -87,6 +128,29 @@ class gridWorld(Environment):
         if (T[0] >= self._w) or (T[1] >= self._h):
             raise ValueError("Value of the tuple need to be in the interval x[0, {}), y[0, {})".format(self._w, self._h))
         return True
+
+    def validateCells(self, cells):
+        """
+        Vectorized validateTuple. cells is a boolean mask with the shape
+        of the grid or an array of shape (K, 2) with positions.
+
+        Returns
+        -------
+        array of shape (K, 2) with the positions
+        """
+        cells = np.asarray(cells)
+        if cells.dtype == np.bool_:
+            if cells.shape != (self._w, self._h):
+                raise ValueError("Mask must have the shape of the grid ({}, {})".format(self._w, self._h))
+            return np.argwhere(cells)
+        cells = cells.reshape(-1, 2)
+        if cells.dtype.kind not in "iu":
+            raise ValueError("Positions must be integers")
+        if np.any(cells < 0):
+            raise ValueError("Values of the positions must be non-negative")
+        if np.any(cells[:,0] >= self._w) or np.any(cells[:,1] >= self._h):
+            raise ValueError("Value of the positions need to be in the interval x[0, {}), y[0, {})".format(self._w, self._h))
+        return cells.astype(np.intp)
     
     def addVortex(self, *vortex):
         """
@@ -100,6 +164,7 @@ class gridWorld(Environment):
         for v in vortex:
             self.validateTuple(v)
             self.vortex += [v]
+        self._layoutVersion += 1
 
     def addObstacles(self, *obstacles):
         """
@@ -113,6 +178,7 @@ class gridWorld(Environment):
         for o in obstacles:
             self.validateTuple(o)
             self.obstacles += [o]
+        self._layoutVersion += 1
     
     def addGoals(self, *goals):
         """
@@ -126,15 +192,159 @@ class gridWorld(Environment):
         for g in goals:
             self.validateTuple(g)
             self.goal += [g]
+        self._layoutVersion += 1
+
+    def addObstaclesBulk(self, cells):
+        """
+        Add many obstacles at once.
+        Parameters
+        ---------
+        cells: array
+            Boolean mask with the shape of the grid or array of shape
+            (K, 2) with the positions of the new obstacles.
+        """
+        self._bulkCells[self.OBST] += [self.validateCells(cells)]
+        self._layoutVersion += 1
+
+    def addVortexBulk(self, cells, probs = None):
+        """
+        Add many vortex at once. Same as addObstaclesBulk. probs is
+        ignored, the vortex of gridWorld do not move.
+        """
+        self._bulkCells[self.VORTEX] += [self.validateCells(cells)]
+        self._layoutVersion += 1
+
+    def addGoalsBulk(self, cells):
+        """
+        Add many goals at once. Same as addObstaclesBulk.
+        """
+        self._bulkCells[self.GOAL] += [self.validateCells(cells)]
+        self._layoutVersion += 1
+
+    def layoutCells(self, kind:int):
+        """
+        Returns an array of shape (K, 2) with the positions added as
+        kind, one of OBST, VORTEX or GOAL.
+        """
+        single = {self.OBST: self.obstacles, self.VORTEX: self.vortex, self.GOAL: self.goal}[kind]
+        cells = [np.array(single, dtype=np.intp).reshape(-1, 2)] + self._bulkCells[kind]
+        return np.concatenate(cells)
+
+    @property
+    def layout(self):
+        """
+        Array with the shape of the grid and the code of each cell, 0 for
+        empty, GOAL, OBST or VORTEX. Cached until the layout changes, it
+        is read only.
+        """
+        return self._layoutTemplate()
+
+    @classmethod
+    def fromArray(cls, layout, initPos:tuple, vortexProb:float = None, **kwargs):
+        """
+        Creates the environment from an array with the code of each cell
+        as in layout. kwargs are passed to the constructor.
+        Parameters
+        ---------
+        layout: array
+            Array of integers of shape (width, height). Must have at least
+            one GOAL.
+        initPos: tuple of int
+            Initial position of the agent.
+        vortexProb: float
+            Default None. Probability of the vortex for stochasticGridWorld,
+            ignored by gridWorld.
+        """
+        layout = np.asarray(layout)
+        assert layout.ndim == 2, "Layout must be a 2D array"
+        goals = np.argwhere(layout == cls.GOAL)
+        assert len(goals) > 0, "Layout needs at least one goal"
+        env = cls(width=layout.shape[0], height=layout.shape[1], initPos=tuple(initPos),
+                  goal=tuple(goals[0].tolist()), **kwargs)
+        env.addObstaclesBulk(layout == cls.OBST)
+        env.addGoalsBulk(goals[1:])
+        if np.any(layout == cls.VORTEX):
+            env.addVortexBulk(layout == cls.VORTEX, vortexProb)
+        env.reset()
+        return env
+
+    @classmethod
+    def fromAscii(cls, text:str, initPos:tuple = None, vortexProb:float = None, **kwargs):
+        """
+        Creates the environment from an ASCII map. Each line is a value
+        of x and each character a value of y. The characters are in ASCII,
+        "." or " " empty, "#" obstacle, "G" goal, "V" vortex and "S" the
+        initial position, used if initPos is None.
+        """
+        lines = [line for line in text.splitlines() if line.strip() != ""]
+        assert len(lines) > 0, "The map is empty"
+        height = max(map(len, lines))
+        chars = np.frombuffer("".join(line.ljust(height) for line in lines).encode("ascii"),
+                              dtype=np.uint8).reshape(len(lines), height)
+        codes = np.full(256, 255, dtype=np.uint8)
+        for c, code in cls.ASCII.items():
+            codes[ord(c)] = code
+        layout = codes[chars]
+        if np.any(layout == 255):
+            raise ValueError("Unknown characters in the map: {}".format(
+                sorted(set(map(chr, np.unique(chars[layout == 255]))))))
+        if initPos is None:
+            start = np.argwhere(chars == ord("S"))
+            assert len(start) == 1, "The map needs one S or an initPos"
+            initPos = tuple(start[0].tolist())
+        return cls.fromArray(layout, initPos, vortexProb, **kwargs)
+
+    @classmethod
+    def loadAscii(cls, path:Union[str, Path], initPos:tuple = None, vortexProb:float = None, **kwargs):
+        """
+        Creates the environment from an ASCII map file. See fromAscii.
+        """
+        with open(path, "r") as file_:
+            return cls.fromAscii(file_.read(), initPos, vortexProb, **kwargs)
+
+    @classmethod
+    def loadNpy(cls, path:Union[str, Path], initPos:tuple, vortexProb:float = None, **kwargs):
+        """
+        Creates the environment from a layout saved with saveNpy or any
+        .npy file with an array as in fromArray.
+        """
+        return cls.fromArray(np.load(path), initPos, vortexProb, **kwargs)
+
+    def saveNpy(self, path:Union[str, Path]):
+        np.save(path, self.layout)
+
+    def toAscii(self, initPos:bool = True) -> str:
+        """
+        Returns the layout as an ASCII map that fromAscii can read.
+        """
+        chars = np.full(256, ord("?"), dtype=np.uint8)
+        for c, code in self.ASCII.items():
+            if c in ".#GV":
+                chars[code] = ord(c)
+        text = chars[self.layout]
+        if initPos and self.layout[self.initX, self.initY] == 0:
+            text[self.initX, self.initY] = ord("S")
+        return "\n".join(row.tobytes().decode("ascii") for row in text) + "\n"
+
+    def _layoutTemplate(self):
+        """
+        Returns the grid with the obstacles, vortex and goals. It is
+        rebuilt only when the layout changes.
+        """
+        if (self._layoutCache is None) or (self._layoutCache[0] != self._layoutVersion):
+            template = np.zeros((self._w, self._h), dtype=np.uint8)
+            # Later kinds overwrite the previous ones on the same cell
+            for kind in (self.OBST, self.VORTEX, self.GOAL):
+                cells = self.layoutCells(kind)
+                template[cells[:,0], cells[:,1]] = kind
+            # Every reset copies it, read only to keep the later episodes
+            template.setflags(write=False)
+            self._layoutCache = (self._layoutVersion, template)
+        return self._layoutCache[1]
 
     def reset(self, initialPos = None):
-        self.grid[:,:] = 0
-        for o in self.obstacles:
-            self.grid[o] = self.OBST
-        for v in self.vortex:
-            self.grid[v] = self.VORTEX
-        for g in self.goal:
-            self.grid[g] = self.GOAL
+        np.copyto(self.grid, self._layoutTemplate())
+        self._gridVersion = self._layoutVersion
         if initialPos is None:
             self.posX = self.initX
             self.posY = self.initY
@@ -180,9 +390,11 @@ class gridWorld(Environment):
         # If the environment has reached a terminal state
         if self.gameOver:
             return self.lastObs, 0, True
+        if self.tableStep and self._defaultDynamics:
+            return self._tableStep(action)
         # Select the action from the corresponding transition probabilities
-        randomSelect = np.random.uniform(0,1)
-        probs, states = self.transProb(self.lastObs, action)
+        randomSelect = self.rng.random()
+        probs, states = self.transProb((self.posX, self.posY), action)
         lastP = 0
         for p, s in zip(probs, states):
             if randomSelect <= (p + lastP):
@@ -196,9 +408,100 @@ class gridWorld(Environment):
             self.gameOver = True
         # Get new state and reward
         self.lastObs = self.getObservation(copy = False)
-        self.lastReward = self.calculateReward(self.lastObs)
+        self.lastReward = self.calculateReward((self.posX, self.posY))
         return self.lastObs, self.lastReward, self.gameOver
 
+    def _tableStep(self, action:int):
+        """
+        Same step as with transProb for the deterministic dynamics, from
+        the tables of _stepTables or, on grids too large for them, from
+        an inline check of the move.
+
+        The draw from rng kept by sameDraws is most of the cost left with
+        the global generator, on 50x50 about 1.3x the general step with
+        it and 3x without. With a seeded rng it is about 1.7x either way.
+        """
+        nextCell, reward, moves = self._stepTables()
+        nA = len(moves)
+        # Keeps the same draw from the generator as the general step
+        if self.sameDraws:
+            self.rng.random()
+        assert (action > 0) and (action <= nA), "Action must be an integer between 1 and {}".format(nA)
+        self.lastAction = action
+        # Python ints, the actions from gridPolicy are UINT_DEFT
+        action = int(action)
+        if nextCell is not None:
+            cell = int(self.posX) * self._h + int(self.posY)
+            self.posX, self.posY = divmod(nextCell[cell * nA + action - 1], self._h)
+        else:
+            dx, dy = moves[action - 1]
+            posX, posY = int(self.posX) + dx, int(self.posY) + dy
+            if (0 <= posX < self._w) and (0 <= posY < self._h) and (self.grid[posX, posY] != self.OBST):
+                self.posX, self.posY = posX, posY
+        self.steps += 1
+        # Check the horizon
+        if self.steps > self.horizon:
+            self.gameOver = True
+        # Get new state and reward
+        self.lastObs = self.getObservation(copy = False)
+        if reward is not None:
+            r = reward[self.posX * self._h + self.posY]
+            if r != -1:
+                self.gameOver = True
+        else:
+            r = self.calculateReward((self.posX, self.posY))
+        self.lastReward = r
+        return self.lastObs, r, self.gameOver
+
+    @classmethod
+    def _hasDefaultDynamics(cls):
+        """
+        True when the class keeps the transProb, validateAction and
+        calculateReward of gridWorld, which the step tables reproduce.
+        """
+        return all(getattr(cls, name) is getattr(gridWorld, name)
+                   for name in ("transProb", "validateAction", "calculateReward"))
+
+    def _stepTables(self):
+        """
+        Returns the flat table with the next cell, x * height + y, at 
+        position cell * n_actions + action - 1, the table of rewards per
+        cell and the moves of the actions as tuples. Rebuilt when the grid
+        changes. Both tables are None when they would have more than
+        STEPTABLELIMIT entries.
+        """
+        if (self._stepCache is None) or (self._stepCache[0] != self._gridVersion):
+            moves = tuple(map(tuple, self._movesArray().tolist()))
+            nextCell, reward = None, None
+            if self._w * self._h * len(moves) <= self.STEPTABLELIMIT:
+                nextCell = self._nextCellTable(moves)
+                # Same rewards as _rewardArray, without the array of cells
+                reward = np.full(self.shape, -1, dtype=np.intc)
+                reward[self.grid == self.VORTEX] -= 14
+                reward[self.grid == self.GOAL] += 11
+                reward = array("i", reward.tobytes())
+            self._stepCache = (self._gridVersion, nextCell, reward, moves)
+        return self._stepCache[1:]
+
+    def _nextCellTable(self, moves):
+        """
+        Fills the next cell table of _stepTables one action at a time,
+        in place on the buffer of the returned array to not hold a copy.
+        """
+        w, h, nA = self._w, self._h, len(moves)
+        # Arrays from the standard library return python ints faster
+        table = array("i", bytes(w * h * nA * array("i").itemsize))
+        view = np.frombuffer(table, dtype=np.intc).reshape(w, h, nA)
+        cells = np.arange(w * h, dtype=np.intc).reshape(w, h)
+        free = self.grid != self.OBST
+        for a, (dx, dy) in enumerate(moves):
+            view[:,:,a] = cells
+            # Cells that move inside the grid and the cells they reach
+            src = (slice(max(0, -dx), w - max(0, dx)), slice(max(0, -dy), h - max(0, dy)))
+            dst = (slice(max(0, dx), w - max(0, -dx)), slice(max(0, dy), h - max(0, -dy)))
+            np.copyto(view[src + (a,)], cells[dst], where=free[dst])
+        return table
+
     def validateAction(self, state, action:int):
         if self.movMode == "8C":
             assert (action > 0) and (action < 10), "Action must be an integer between 1 and 9"
@@ -207,18 +510,20 @@ class gridWorld(Environment):
             assert (action > 0) and (action < 6), "Action must be an integer between 1 and 5"
             dx, dy = self.actions[self.actions4C[action - 1]]
         self.lastAction = action
-        posX, posY = state["agent"]
+        if isinstance(state, dict):
+            state = state["agent"]
+        posX, posY = state
         # Tentative new position
         posX += dx
         posY += dy
         # Checking the movements be inside the grid
         if (posX < 0) or (posX >= self._w) or (posY < 0) or (posY >= self._h):
             # Is not inside the grid, this does nothing
-            return state["agent"]
+            return state
         # Checking if the movement gets it to an obstacle
         elif self.grid[posX, posY] == self.OBST:
             # Returns the same position as before
-            return state["agent"]
+            return state
         else:
             # No obstacle the new position is returned
             return posX, posY
@@ -239,6 +544,14 @@ class gridWorld(Environment):
         return reward 
 
     def getObservation(self, copy:bool = True):
+        if self.obsMode == "coords":
+            return (self.posX, self.posY)
+        elif self.obsMode == "index":
+            # Flat list of the state ids, x * height + y, per grid version
+            cache = self._idCache
+            if (cache is None) or (cache[0] != self._gridVersion):
+                cache = self._idCache = (self._gridVersion, self._statesCached()[0].ravel().tolist())
+            return cache[1][self.posX * self._h + self.posY]
         if copy:
             return {"agent":(self.posX, self.posY), 
                     "grid": np.copy(self.grid)}
@@ -246,48 +559,125 @@ class gridWorld(Environment):
             return {"agent":(self.posX, self.posY), 
                     "grid": self.grid}
 
-    def render(self, values=None, policy=None):
-        # Suboptimal but simple to understand graphics for the environment
-        fig = plt.figure(figsize=(self._w * self.GRAPHSCALE, self._h * self.GRAPHSCALE), clear = True)
-        self.frame[:,:] = self.EMPTYC
-        
+    def render(self, values=None, policy=None, mode:str = "human"):
+        """
+        Draws the environment. In mode "human" the frame is shown with
+        matplotlib along with the values and policy if given. In mode 
+        "rgb_array" the frame is returned as an array of shape
+        (width * CELLSIZE, height * CELLSIZE, 3) without using matplotlib.
+
+        values are drawn as a heatmap, labeled only on grids up to 
+        TEXTLIMIT cells, and policy as arrows. Both accept dense arrays
+        with the shape of the grid, see _valueGrid and _policyGrid.
+        """
+        frame = self._renderFrame()
+        if mode == "rgb_array":
+            return np.copy(frame)
+        import matplotlib.pyplot as plt
+        scale = min(self.GRAPHSCALE, self.MAXFIGSIZE / max(self._w, self._h))
+        fig = plt.figure(figsize=(self._w * scale, self._h * scale), clear = True)
+        plt.imshow(frame)
+        c = self.CELLSIZE
+        extent = (-0.5, self._h * c - 0.5, self._w * c - 0.5, -0.5)
+        free = self.grid != self.OBST
         if values is not None:
-            if isinstance(values, Q_function):
-                Q = values
-                values = np.zeros(self.shape)
-                for s in Q.getStates():
-                    values[s] = Q[(s, Q.maxAction(s))]
-        
-        for i in range(self._w):
-            for j in range(self._h):
-                cell = self.grid[i,j]
-                ni, nj = self.CELLSIZE * i, self.CELLSIZE * j
-                f = self.frame[ni:ni+self.CELLSIZE,nj:nj+self.CELLSIZE]
-                if cell == self.OBST:
-                    f[:,:,:] = self.OBSTC
-                elif cell == self.VORTEX:
-                    f[self.VORTEXD,:] = self.VORTEXC
-                elif cell == self.GOAL:
-                    f[self.GOALD,:] = self.GOALC
-                if values is not None:
-                    plt.text(nj + 1.5, ni + 1.5, str(np.round(values[i,j], 2)),
+            values = self._valueGrid(values)
+            plt.imshow(np.ma.masked_where(~free, values), extent=extent, alpha=self.VALUEALPHA,
+                       interpolation="nearest", cmap=self.VALUECMAP)
+            plt.colorbar(fraction=0.046, pad=0.04)
+            if values.size <= self.TEXTLIMIT:
+                for i, j in np.argwhere(free).tolist():
+                    plt.text(c * j + 1.5, c * i + 1.5, str(np.round(values[i,j], 2)),
                              horizontalalignment='center',
                              verticalalignment='center',)
-                if policy is not None and (cell == 0):
-                    action = policy.getAction((i,j)) - 1
-                    if self.movMode == "4C":
-                        action = self.actions4C[action]
-                    dx, dy = self.actions[action]
-                    plt.arrow(nj + 1.5, ni + 1.5, 1.5 * dy, 1.5 * dx, width=0.2, color=self.POLICYC)
-        ni, nj = self.posX * self.CELLSIZE, self.posY * self.CELLSIZE
-        f = self.frame[ni:ni+self.CELLSIZE,nj:nj+self.CELLSIZE,:] 
-        f[self.AGENTD,:] = self.AGENTC
+        if policy is not None:
+            dx, dy = self._policyMoves(self._policyGrid(policy))
+            # Arrows only on the empty cells that move the agent
+            i, j = np.nonzero((self.grid == 0) & ((dx != 0) | (dy != 0)))
+            plt.quiver(c * j + 1.5, c * i + 1.5, 1.5 * dy[i,j], 1.5 * dx[i,j], angles="xy",
+                       scale_units="xy", scale=1, width=0.2 / (self._h * c), color=self.POLICYC)
         plt.title("GridWorld {}x{} Action {} Reward {}".format(self._w, self._h, 
                                                                self.lastAction, 
                                                                self.lastReward))
-        plt.imshow(self.frame)
         plt.axis("off")
 
+    def _valueGrid(self, values):
+        """
+        Returns values as an array with the shape of the grid. values can
+        be an array, a Q_array or a Q_function, the last two as the value
+        of their best action.
+        """
+        if isinstance(values, Q_array):
+            return values.values.max(axis=-1)
+        if isinstance(values, Q_function):
+            Q = values
+            values = np.zeros(self.shape)
+            for s in Q.getStates():
+                values[s] = Q[(s, Q.maxAction(s))]
+            return values
+        return np.asarray(values).reshape(self.shape)
+
+    def _policyGrid(self, policy):
+        """
+        Returns the actions of policy on each cell as an array with the
+        shape of the grid. policy can be an array of actions, a Q_array or 
+        Q_function with their best actions, a policy with a pi array like
+        gridPolicy, or any other policy which getAction is called per cell.
+        """
+        if isinstance(policy, np.ndarray):
+            return policy.reshape(self.shape)
+        if isinstance(policy, Q_array):
+            return policy.values.argmax(axis=-1) + policy.mA
+        pi = getattr(policy, "pi", None)
+        if isinstance(pi, np.ndarray) and (pi.shape == self.shape):
+            return pi
+        actions = np.full(self.shape, 5, dtype=INT_DEFT)
+        get = policy.maxAction if isinstance(policy, Q_function) else policy.getAction
+        for i, j in np.argwhere(self.grid == 0).tolist():
+            actions[i,j] = get((i,j))
+        return actions
+
+    def _policyMoves(self, actions):
+        """
+        Returns the arrays dx and dy of the moves of an array of actions.
+        """
+        actions = np.asarray(actions, dtype=np.intp) - 1
+        if self.movMode == "4C":
+            actions = np.array(self.actions4C)[np.clip(actions, 0, len(self.actions4C) - 1)]
+        moves = np.array(self.actions)[np.clip(actions, 0, len(self.actions) - 1)]
+        return moves[...,0], moves[...,1]
+
+    def _renderFrame(self):
+        """
+        Updates self.frame from the cached background of the grid, only
+        the tiles of the agent are redrawn.
+        """
+        c = self.CELLSIZE
+        if (self._bgGrid is None) or not np.array_equal(self._bgGrid, self.grid):
+            self._bgGrid = np.copy(self.grid)
+            self._background = self._drawBackground()
+            self._agentMask = np.array(self.AGENTD, dtype=np.bool_)
+            self.frame[:,:] = self._background
+            self._agentTile = None
+        elif self._agentTile is not None:
+            ni, nj = self._agentTile
+            self.frame[ni:ni+c,nj:nj+c] = self._background[ni:ni+c,nj:nj+c]
+        ni, nj = self.posX * c, self.posY * c
+        self.frame[ni:ni+c,nj:nj+c][self._agentMask] = self.AGENTC
+        self._agentTile = (ni, nj)
+        return self.frame
+
+    def _drawBackground(self):
+        c = self.CELLSIZE
+        cells = np.repeat(np.repeat(self.grid, c, axis=0), c, axis=1)
+        sprite = lambda D: np.tile(np.array(D, dtype=np.bool_), self.shape)
+        background = np.empty_like(self.frame)
+        background[:,:] = self.EMPTYC
+        background[cells == self.OBST] = self.OBSTC
+        background[(cells == self.VORTEX) & sprite(self.VORTEXD)] = self.VORTEXC
+        background[(cells == self.GOAL) & sprite(self.GOALD)] = self.GOALC
+        return background
+
     def updateGrid(self):
         pass
 
@@ -297,12 +687,36 @@ class gridWorld(Environment):
 
     @property
     def observationSpace(self):
-        states = []
-        for i in range(self._w):
-            for j in range(self._h):
-                if not self.grid[i,j] == self.OBST:
-                    states += [(i,j)]
-        return states
+        # A new list each time, the cached states are not exposed
+        return list(self._statesCached()[2])
+
+    @property
+    def stateArray(self):
+        """
+        Array of shape (S, 2) with all the valid states in the same order
+        as observationSpace. Cached until the layout changes, it is read
+        only.
+        """
+        return self._statesCached()[1]
+
+    def stateToIndex(self, state):
+        """
+        Returns the position of the state in stateArray, -1 for an obstacle.
+        """
+        if isinstance(state, dict):
+            state = state["agent"]
+        return int(self._statesCached()[0][tuple(state)])
+
+    def indexToState(self, i:int):
+        return self._statesCached()[2][i]
+
+    def _statesCached(self):
+        if (self._statesCache is None) or (self._statesCache[0] != self._gridVersion):
+            index, states = self._stateIndex()
+            index.setflags(write=False)
+            states.setflags(write=False)
+            self._statesCache = (self._gridVersion, index, states, tuple(map(tuple, states.tolist())))
+        return self._statesCache[1:]
 
     def transProb(self, state, action):
         # Deterministic Environment
@@ -332,6 +746,78 @@ class gridWorld(Environment):
     def shape(self):
         return self.grid.shape
 
+    def _movesArray(self):
+        """
+        Returns an array of shape (n_actions, 2) with the displacement
+        of each action. Row i corresponds to the action i + 1.
+        """
+        moves = np.array(self.actions, dtype=INT_DEFT)
+        if self.movMode == "4C":
+            moves = moves[self.actions4C]
+        return moves
+
+    def getModel(self):
+        """
+        Builds the array form of the dynamics of the environment from
+        the actual grid. The terminal states are absorbing with zero reward
+        and the horizon is not considered.
+
+        Returns
+        -------
+        gridModel
+        """
+        index, states = self._statesCached()[:2]
+        terminal = self._terminalArray(states)
+        nextS = self._nextStateTable(index, states, terminal)
+        S, A = nextS.shape
+        R = self._rewardArray(states)[nextS]
+        R[terminal] = 0
+        return gridModel(np.arange(S * A + 1, dtype=np.int64), nextS.ravel(), np.ones(S * A),
+                         R, terminal, states, index, self.actionSpace.mV)
+
+    def _stateIndex(self):
+        """
+        Returns the array with the index of each cell, -1 for the obstacles,
+        and the array of shape (S, 2) with the position of each index. The
+        order is the same as observationSpace.
+        """
+        valid = self.grid != self.OBST
+        states = np.argwhere(valid).astype(INT_DEFT)
+        index = np.full(self.shape, -1, dtype=INT_DEFT)
+        index[states[:,0], states[:,1]] = np.arange(len(states), dtype=INT_DEFT)
+        return index, states
+
+    def _terminalArray(self, states):
+        cells = self.grid[states[:,0], states[:,1]]
+        return (cells == self.VORTEX) | (cells == self.GOAL)
+
+    def _rewardArray(self, states):
+        """
+        Returns the reward obtained when arriving to each state as in
+        calculateReward.
+        """
+        cells = self.grid[states[:,0], states[:,1]]
+        reward = np.full(len(states), -1.0)
+        reward[cells == self.VORTEX] -= 14
+        reward[cells == self.GOAL] += 11
+        return reward
+
+    def _nextStateTable(self, index, states, terminal = None):
+        """
+        Returns the array of shape (S, n_actions) with the index of the state
+        reached with each action as in validateAction. Terminal states, if
+        given, stay in place.
+        """
+        new = states[:,None,:] + self._movesArray()[None,:,:]
+        inside = (new[:,:,0] >= 0) & (new[:,:,0] < self._w) & (new[:,:,1] >= 0) & (new[:,:,1] < self._h)
+        nextS = np.where(inside, index[np.clip(new[:,:,0], 0, self._w - 1), np.clip(new[:,:,1], 0, self._h - 1)], -1)
+        stay = np.broadcast_to(np.arange(len(states), dtype=INT_DEFT)[:,None], nextS.shape)
+        stayMask = nextS < 0
+        if terminal is not None:
+            stayMask |= terminal[:,None]
+        nextS = np.where(stayMask, stay, nextS)
+        return nextS.astype(INT_DEFT)
+
 class stochasticGridWorld(gridWorld):
     """
     A modification to the GridWorld to add moving vortex with random directions.
@@ -353,11 +839,21 @@ class stochasticGridWorld(gridWorld):
     horizon: int
         Default 10**6. Number of steps to run the environment before it
         terminates.
+    rng: int, np.random.Generator or bufferedRNG
+        Default None. Generator or seed for the transitions and the
+        action space samples. If None the global np.random state is used.
+    obsMode: str
+        Default "dict". Observation returned by step and reset. "dict" is
+        {"agent": (x, y), "grid": grid}, "coords" the tuple (x, y) and 
+        "index" the integer of the state as in stateToIndex.
 
     """
-    def __init__(self, width:int, height:int, initPos:tuple, goal:tuple, movement:str = "4C", horizon:int = 10**6):
-        super().__init__(width, height, initPos, goal, movement, horizon)
+    tableStep = False
+
+    def __init__(self, width:int, height:int, initPos:tuple, goal:tuple, movement:str = "4C", horizon:int = 10**6, rng = None, obsMode:str = "dict"):
         self.vortexProb = []
+        self._vortexCache = None
+        super().__init__(width, height, initPos, goal, movement, horizon, rng, obsMode)
 
     def addVortex(self, *vortex):
         """
@@ -377,39 +873,129 @@ class stochasticGridWorld(gridWorld):
             p = v[2]
             assert (p >= 0) and (p < 1), "The probability; third item on the tuple needs to be between 0 and 1"
             self.vortexProb += [v[2]]
+        self._layoutVersion += 1
+
+    def addVortexBulk(self, cells, probs = None):
+        """
+        Add many stochastic vortex at once.
+        Parameters
+        ---------
+        cells: array
+            Boolean mask with the shape of the grid or array of shape
+            (K, 2) with the positions of the new vortex.
+        probs: float or array
+            Probability of each vortex, in [0, 1).
+        """
+        assert probs is not None, "Stochastic vortex need their probabilities"
+        cells = self.validateCells(cells)
+        probs = np.broadcast_to(np.asarray(probs, dtype=np.float64), (len(cells),))
+        assert np.all((probs >= 0) & (probs < 1)), "The probabilities need to be between 0 and 1"
+        # Kept on the lists, transProb reads them per vortex
+        self.vortex += list(map(tuple, cells.tolist()))
+        self.vortexProb += probs.tolist()
+        self._layoutVersion += 1
     
     def transProb(self, state, action):
-        # Local function
-        def nearby(pos:tuple, vortex:tuple, diag:bool):
-            d1 = abs(pos[0] - vortex[0])
-            d2 = abs(pos[1] - vortex[1])
-            if (d1 <= 1) and (d2 <= 1) and (diag == True):
-                return True
-            elif ((d1 == 1 and d2 == 0) or (d1 == 0 and d2 == 1)) and (diag == False):
-                return True
-            else:
-                return False
         # Checking state type
         if isinstance(state, dict):
             agent = state["agent"]
         else:
             agent = state
-        # Init
-        states = []
-        probs = []
-        # Check if the agent is nearby 1 cell of the effect of the vortex
-        for v, p in zip(self.vortex, self.vortexProb):
-            if nearby(agent, v, True if self.movMode == "8C" else False):
-                states += [v]
-                probs += [p]
+        agent = tuple(agent)
+        near, cache = self._vortexIndex()
+        # The results are shared between calls, so they are immutable
+        cached = cache.get((agent, action))
+        if cached is not None:
+            self.lastAction = action
+            return cached
+        # Vortex nearby 1 cell of the agent
+        vStates, vProbs = near.get(agent, ((), ()))
         # Add the action state
-        states += [self.validateAction(state, action)]
+        states = tuple(vStates) + (self.validateAction(state, action),)
         n = len(states) - 1
         if n == 0:
-            probs = [1]
+            probs = (1,)
         else:
-            probs += [n - sum(probs)]
+            probs = list(vProbs) + [n - sum(vProbs)]
             # Normalize the probabilities
             probs = np.array(probs, dtype=np.float32)
             probs = probs / n 
-        return probs, states
\ No newline at end of file
+            probs.setflags(write=False)
+        cache[(agent, action)] = (probs, states)
+        return probs, states
+
+    def _vortexIndex(self):
+        """
+        Returns the dictionary from each cell to the vortex that can 
+        attract the agent from it, with their probabilities, and the cache
+        of transProb. Both are rebuilt when the layout changes.
+        """
+        version = (self._layoutVersion, self._gridVersion)
+        if (self._vortexCache is None) or (self._vortexCache[0] != version):
+            near = dict()
+            offsets = self._vortexOffsets().tolist()
+            for v, p in zip(self.vortex, self.vortexProb):
+                for dx, dy in offsets:
+                    vStates, vProbs = near.setdefault((v[0] + dx, v[1] + dy), ([], []))
+                    vStates += [v]
+                    vProbs += [p]
+            self._vortexCache = (version, near, dict())
+        return self._vortexCache[1:]
+
+    def _vortexOffsets(self):
+        """
+        Returns an array with the relative positions from which a vortex
+        can attract the agent. Follows the same rule as transProb.
+        """
+        if self.movMode == "8C":
+            return np.array([(i, j) for i in (-1, 0, 1) for j in (-1, 0, 1)], dtype=INT_DEFT)
+        return np.array([(-1, 0), (0, -1), (0, 1), (1, 0)], dtype=INT_DEFT)
+
+    def _vortexArrays(self):
+        """
+        Returns two arrays with the shape of the grid. The first one counts
+        the vortex on each cell and the second one sums their probabilities.
+        """
+        count = np.zeros(self.shape, dtype=INT_DEFT)
+        prob = np.zeros(self.shape, dtype=FLOAT_DEFT)
+        if len(self.vortex) > 0:
+            pos = np.array(self.vortex, dtype=INT_DEFT)
+            np.add.at(count, (pos[:,0], pos[:,1]), 1)
+            np.add.at(prob, (pos[:,0], pos[:,1]), np.array(self.vortexProb, dtype=FLOAT_DEFT))
+        return count, prob
+
+    def getModel(self):
+        index, states = self._statesCached()[:2]
+        terminal = self._terminalArray(states)
+        nextS = self._nextStateTable(index, states, terminal)
+        reward = self._rewardArray(states)
+        S, A = nextS.shape
+        # Vortex around each state
+        count, prob = self._vortexArrays()
+        near = states[:,None,:] + self._vortexOffsets()[None,:,:]
+        inside = (near[:,:,0] >= 0) & (near[:,:,0] < self._w) & (near[:,:,1] >= 0) & (near[:,:,1] < self._h)
+        nx = np.clip(near[:,:,0], 0, self._w - 1)
+        ny = np.clip(near[:,:,1], 0, self._h - 1)
+        inside &= ~terminal[:,None]
+        n = np.where(inside, count[nx, ny], 0).sum(axis=1)
+        vProb = np.where(inside, prob[nx, ny], 0.0) / np.maximum(n, 1)[:,None]
+        aProb = np.where(n > 0, 1.0 - vProb.sum(axis=1), 1.0)
+        # Entries per row, the vortex first and the action state last
+        vs, vk = np.nonzero(vProb > 0)
+        m = np.bincount(vs, minlength=S)
+        indptr = np.zeros(S * A + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum(np.repeat(m + 1, A))
+        indices = np.empty(indptr[-1], dtype=INT_DEFT)
+        probs = np.empty(indptr[-1])
+        rank = np.arange(len(vs)) - (np.cumsum(m) - m)[vs]
+        pos = indptr[:-1].reshape(S, A)[vs] + rank[:,None]
+        indices[pos] = index[nx[vs, vk], ny[vs, vk]][:,None]
+        probs[pos] = vProb[vs, vk][:,None]
+        indices[indptr[1:] - 1] = nextS.ravel()
+        probs[indptr[1:] - 1] = np.repeat(aProb, A)
+        # Expected rewards
+        R = aProb[:,None] * reward[nextS]
+        vIndex = index[nx, ny]
+        R += np.where(vProb > 0, vProb * reward[vIndex], 0.0).sum(axis=1)[:,None]
+        R[terminal] = 0
+        return gridModel(indptr, indices, probs, R, terminal, states, index, self.actionSpace.mV)
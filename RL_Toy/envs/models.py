@@ -0,0 +1,159 @@
+from RL_Toy.base.const import *
+
+class gridModel():
+    """
+    Array form of the dynamics of a grid environment.
+
+    The transition probabilities P[s, a, s'] are stored as a sparse
+    matrix in CSR format with one row per pair (s, a), row s * nActions + a.
+    The entries of the row r are indices[indptr[r]:indptr[r+1]] with the
+    probabilities probs[indptr[r]:indptr[r+1]].
+
+    Parameters
+    ----------
+    indptr: array of int
+        Array of size nStates * nActions + 1 with the row pointers.
+    indices: array of int
+        Index of the next state per entry.
+    probs: array of float
+        Probability per entry.
+    R: array of float
+        Array of shape (nStates, nActions) with the expected reward.
+    terminal: array of bool
+        Array of size nStates, True for the terminal states. These are
+        absorbing with zero reward.
+    states: array of int
+        Array of shape (nStates, 2) with the position of each state index.
+    index: array of int
+        Array with the shape of the grid with the index of each cell, -1
+        for the cells that are not states.
+    minAction: int
+        Default 1. Action that corresponds to the column 0.
+    """
+    def __init__(self, indptr, indices, probs, R, terminal, states, index, minAction:int = 1):
+        self.indptr = indptr
+        self.indices = indices
+        self.probs = probs
+        # Column major, the reductions over the actions are faster
+        self.R = np.asfortranarray(R)
+        self.terminal = terminal
+        self.states = states
+        self.index = index
+        self.minAction = minAction
+        self._rows = None
+        self._policyRows = None
+
+    @property
+    def nStates(self):
+        return self.R.shape[0]
+
+    @property
+    def nActions(self):
+        return self.R.shape[1]
+
+    @property
+    def shape(self):
+        return self.index.shape
+
+    def stateToIndex(self, state):
+        if isinstance(state, dict):
+            state = state["agent"]
+        return int(self.index[tuple(state)])
+
+    def indexToState(self, i:int):
+        return tuple(self.states[i].tolist())
+
+    def _compactRows(self):
+        """
+        Returns the CSR rows split in their first entry, as arrays of shape
+        (nStates, nActions), and the rest of the entries of the few rows
+        with more than one, padded to the same length with probability 0.
+        The first probabilities are None if all of them are 1.
+        """
+        if self._rows is None:
+            S, A = self.R.shape
+            start = self.indptr[:-1]
+            length = np.diff(self.indptr)
+            first = np.asfortranarray(self.indices[start].astype(np.intp).reshape(S, A))
+            firstP = np.asfortranarray(self.probs[start].reshape(S, A))
+            if np.all(firstP == 1):
+                firstP = None
+            multi = np.flatnonzero(length > 1)
+            counts = length[multi] - 1
+            width = int(counts.max()) if len(multi) > 0 else 0
+            extraIdx = np.zeros((len(multi), width), dtype=np.intp)
+            extraP = np.zeros((len(multi), width))
+            row = np.repeat(np.arange(len(multi)), counts)
+            col = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            src = np.repeat(start[multi] + 1, counts) + col
+            extraIdx[row, col] = self.indices[src]
+            extraP[row, col] = self.probs[src]
+            self._rows = (first, firstP, multi // A, multi % A, extraIdx, extraP)
+        return self._rows
+
+    def expectedValue(self, V, actions = None):
+        """
+        Returns the array of shape (nStates, nActions) with the expected
+        value of V over the next states, sum_s' P[s, a, s'] V[s']. If the
+        array actions with a column per state is given, returns only the
+        array of size nStates with the values of those pairs.
+        """
+        V = np.asarray(V)
+        first, firstP, multiS, multiA, extraIdx, extraP = self._compactRows()
+        if actions is not None:
+            first, firstP, multiS, extraIdx, extraP = self._selectRows(actions)
+        E = V[first]
+        if firstP is not None:
+            E *= firstP
+        if len(multiS) > 0:
+            extra = (extraP * V[extraIdx]).sum(axis=1)
+            if actions is None:
+                E[multiS, multiA] += extra
+            else:
+                E[multiS] += extra
+        return E
+
+    def selectActions(self, X, actions):
+        """
+        Returns X[s, actions[s]] for each state from X of shape
+        (nStates, nActions).
+        """
+        X = np.asfortranarray(X)
+        S = self.nStates
+        return X.ravel(order="F")[np.asarray(actions) * S + np.arange(S)]
+
+    def _selectRows(self, actions):
+        """
+        The compact rows of expectedValue for the pairs (s, actions[s]).
+        The last selection is kept while the same actions are asked.
+        """
+        cached = self._policyRows
+        if (cached is not None) and np.array_equal(cached[0], actions):
+            return cached[1]
+        actions = np.array(actions, dtype=np.intp)
+        first, firstP, multiS, multiA, extraIdx, extraP = self._compactRows()
+        chosen = multiA == actions[multiS]
+        selected = (self.selectActions(first, actions),
+                    None if firstP is None else self.selectActions(firstP, actions),
+                    multiS[chosen], extraIdx[chosen], extraP[chosen])
+        self._policyRows = (actions, selected)
+        return selected
+
+    def toGrid(self, X, fill = 0):
+        """
+        Returns an array with the shape of the grid from an array indexed
+        by state. The cells that are not states are set to fill.
+        """
+        X = np.asarray(X)
+        grid = np.full(self.shape + X.shape[1:], fill, dtype=X.dtype)
+        grid[self.states[:,0], self.states[:,1]] = X
+        return grid
+
+    def toScipy(self):
+        """
+        Returns P as a scipy.sparse.csr_matrix of shape
+        (nStates * nActions, nStates). Needs scipy installed.
+        """
+        from scipy.sparse import csr_matrix
+        return csr_matrix((self.probs, self.indices, self.indptr),
+                          shape=(self.nStates * self.nActions, self.nStates))
@@ -0,0 +1,180 @@
+from RL_Toy.base.const import *
+from RL_Toy.envs.grids import gridWorld, stochasticGridWorld
+
+class VecGridWorld(gridWorld):
+    """
+    Batch of deterministic grid worlds that share the same layout.
+    All the agents are stepped at once with array operations and the
+    finished episodes are restarted automatically.
+
+    Parameters
+    ----------
+    nEnvs: int
+        Number of environments to run in parallel.
+    width: int
+        First dimension of the grid
+    height: int
+        Second dimension of the grid
+    initPos: tuple of int
+        Initial position of the agents.
+    goal: tuple of int
+        Position of the first goal to create the grid.
+        One can add more goals later if required.
+    movement: str
+        Default 4C. Refer to gridWorld.step method.
+    horizon: int
+        Default 10**6. Number of steps to run each environment before it
+        terminates.
+    rng: int, np.random.Generator or bufferedRNG
+        Default None. Generator or seed for the transitions. If None the
+        global np.random state is used.
+
+    The layout is built with the same methods addObstacles, addVortex and
+    addGoals of gridWorld. Call reset after changing it.
+    """
+    def __init__(self, nEnvs:int, width:int, height:int, initPos:tuple, goal:tuple, movement:str = "4C", horizon:int = 10**6, rng = None):
+        assert nEnvs > 0, "Number of environments must be greater than 0"
+        self.nEnvs = nEnvs
+        super().__init__(width, height, initPos, goal, movement, horizon, rng)
+
+    def reset(self, initialPos = None):
+        """
+        Rebuilds the layout and restarts all the environments.
+
+        Returns
+        -------
+        observation
+            Array of shape (nEnvs, 2) with the positions of the agents.
+        """
+        super().reset(initialPos)
+        self._moves = self._movesArray()
+        self._initPos = np.array((self.posX, self.posY), dtype=INT_DEFT)
+        self.positions = np.tile(self._initPos, (self.nEnvs, 1))
+        self.steps = np.zeros(self.nEnvs, dtype=INT_DEFT)
+        self.gameOver = np.zeros(self.nEnvs, dtype=np.bool_)
+        self.terminalPositions = self.positions.copy()
+        self.lastReward = np.zeros(self.nEnvs, dtype=INT_DEFT)
+        self.lastAction = np.full(self.nEnvs, 5, dtype=INT_DEFT)
+        return self.positions.copy()
+
+    def step(self, actions):
+        """
+        Execute a step on every environment. The actions follow the same
+        meaning as in gridWorld.step.
+
+        Environments that reach a terminal state or the horizon are restarted
+        on the same call. Their last position before the restart is kept in
+        terminalPositions.
+
+        Parameters
+        ----------
+        actions: array of int
+            Array of shape (nEnvs,) with one action per environment.
+
+        Returns
+        -------
+        observation, reward, done
+            Arrays of shapes (nEnvs, 2), (nEnvs,) and (nEnvs,).
+        """
+        actions = np.asarray(actions, dtype=INT_DEFT)
+        assert actions.shape == (self.nEnvs,), "Expected one action per environment"
+        assert (actions.min() > 0) and (actions.max() <= len(self._moves)), \
+            "Actions must be integers between 1 and {}".format(len(self._moves))
+        self.lastAction = actions
+        self.positions = self._nextPositions(actions)
+        self.steps += 1
+        # Get the rewards and terminal states
+        cells = self.grid[self.positions[:,0], self.positions[:,1]]
+        vortex, goal = cells == self.VORTEX, cells == self.GOAL
+        reward = np.full(self.nEnvs, -1, dtype=INT_DEFT)
+        reward[vortex] -= 14
+        reward[goal] += 11
+        done = vortex | goal | (self.steps > self.horizon)
+        self.lastReward = reward
+        self.gameOver = done
+        # Restart the finished environments
+        self.terminalPositions = self.positions.copy()
+        if done.any():
+            self.positions[done] = self._initPos
+            self.steps[done] = 0
+        return self.positions.copy(), reward, done
+
+    def _nextPositions(self, actions):
+        """
+        Returns the positions after the actions are applied. Movements
+        outside the grid or to an obstacle leave the agent in place.
+        """
+        new = self.positions + self._moves[actions - 1]
+        inside = (new[:,0] >= 0) & (new[:,0] < self._w) & (new[:,1] >= 0) & (new[:,1] < self._h)
+        new[~inside] = self.positions[~inside]
+        blocked = self.grid[new[:,0], new[:,1]] == self.OBST
+        new[blocked] = self.positions[blocked]
+        return new
+
+    def getObservation(self, copy:bool = True):
+        if not hasattr(self, "positions"):
+            return super().getObservation(copy)
+        return self.positions.copy() if copy else self.positions
+
+    def render(self, values=None, policy=None, mode:str = "human", env:int = 0):
+        """
+        Renders the environment with index env.
+        """
+        self.posX, self.posY = self.positions[env]
+        return super().render(values, policy, mode)
+
+class VecStochasticGridWorld(VecGridWorld, stochasticGridWorld):
+    """
+    Batch of stochastic grid worlds that share the same layout. The vortex
+    attract the agents with the same probabilities as in
+    stochasticGridWorld.
+
+    Parameters
+    ----------
+    nEnvs: int
+        Number of environments to run in parallel.
+    width: int
+        First dimension of the grid
+    height: int
+        Second dimension of the grid
+    initPos: tuple of int
+        Initial position of the agents.
+    goal: tuple of int
+        Position of the first goal to create the grid.
+        One can add more goals later if required.
+    movement: str
+        Default 4C. Refer to gridWorld.step method.
+    horizon: int
+        Default 10**6. Number of steps to run each environment before it
+        terminates.
+    rng: int, np.random.Generator or bufferedRNG
+        Default None. Generator or seed for the transitions. If None the
+        global np.random state is used.
+
+    Vortex are added with the tuples (x, y, p) as in stochasticGridWorld.
+    """
+    def reset(self, initialPos = None):
+        obs = super().reset(initialPos)
+        self._vOffsets = self._vortexOffsets()
+        self._vCount, self._vProb = self._vortexArrays()
+        return obs
+
+    def _nextPositions(self, actions):
+        new = super()._nextPositions(actions)
+        if len(self.vortex) == 0:
+            return new
+        # Vortex cells around each agent
+        near = self.positions[:,None,:] + self._vOffsets[None,:,:]
+        inside = (near[:,:,0] >= 0) & (near[:,:,0] < self._w) & (near[:,:,1] >= 0) & (near[:,:,1] < self._h)
+        nx = np.clip(near[:,:,0], 0, self._w - 1)
+        ny = np.clip(near[:,:,1], 0, self._h - 1)
+        count = np.where(inside, self._vCount[nx, ny], 0)
+        prob = np.where(inside, self._vProb[nx, ny], 0.0)
+        n = count.sum(axis=1)
+        # Select from the cumulative probabilities, the remainder is the action
+        cum = np.cumsum(prob, axis=1) / np.maximum(n, 1)[:,None]
+        throw = self.rng.random(size=self.nEnvs)
+        k = (cum < throw[:,None]).sum(axis=1)
+        pulled = (n > 0) & (k < len(self._vOffsets))
+        new[pulled] = near[pulled, k[pulled]]
+        return new
@@ -1,6 +1,7 @@
 from RL_Toy.base.const import *
 from RL_Toy.base.basics import Policy
-from RL_Toy.utils.functions import toDiscreteSpace, cartesian_product, checkForTuple
+from RL_Toy.base.rng import getRNG
+from RL_Toy.utils.functions import toDiscreteSpace, cartesian_product, checkForTuple, boxDiscretizer
 
 class gymPolicy(Policy):
     """
@@ -17,8 +18,11 @@ class gymPolicy(Policy):
     epsilonFunction: python function
         Must work as function(this), where this is the
         actual policy object. Should return a float.
+    rng: int, np.random.Generator or bufferedRNG
+        Default None. Generator or seed for the exploration and its random
+        actions. If None the global np.random state is used.
     """
-    def __init__(self, env, function, epsilonFunction):
+    def __init__(self, env, function, epsilonFunction, rng = None):
         self._eps_ = 0.0
         self._eps_test_ = 0.05
         self.test = False
@@ -26,6 +30,7 @@ class gymPolicy(Policy):
 
         self.env = env
         self.actionSpace = env.action_space
+        self.discrete = None
         from gym.spaces import Box, Discrete
         
         if isinstance(self.actionSpace, (Box)):
@@ -35,15 +40,30 @@ class gymPolicy(Policy):
         
         self.actionFunction = function
         self.epsilonFunction = epsilonFunction
+        self.rng = getRNG(rng)
 
     def _calculate_action(self, obs):
         return self.actionFunction(self, obs)
     
     def getAction(self, obs):
-        if (np.random.uniform() < self.epsilon) and not self.greedy:
-            return self.actionSpace.sample()
+        if (self.rng.random() < self.epsilon) and not self.greedy:
+            return self._sampleAction()
         return self._calculate_action(obs)
 
+    def _sampleAction(self):
+        """
+        Random action from self.rng. Unbounded Box spaces fall back to
+        their own sample.
+        """
+        aS = self.actionSpace
+        if self.discrete:
+            start = int(getattr(aS, "start", 0))
+            return int(self.rng.integers(start, start + aS.n))
+        if self.discrete is False and np.all(aS.bounded_below) and np.all(aS.bounded_above):
+            x = aS.low + (aS.high - aS.low) * np.asarray(self.rng.random(size=aS.shape))
+            return x.astype(aS.dtype)
+        return aS.sample()
+
     def _get_epsilon(self):
         if self.test:
             return self._eps_test_
@@ -57,10 +77,24 @@ class gymPolicy(Policy):
         
     epsilon = property(_get_epsilon, _set_epsilon)
 
+class _lazyPolicyTable(dict):
+    """
+    Dictionary that creates a random action for a key on its first visit.
+    """
+    def __init__(self, sample):
+        super().__init__()
+        self.sample = sample
+
+    def __missing__(self, key):
+        action = self.sample()
+        self[key] = action
+        return action
+
 class gymPolicyDiscreteFromCon(Policy):
     """
     Gym policy from a continuos observation space and a
-    discrete action space
+    discrete action space. The action for each discrete cell is
+    initialized at random on its first visit.
 
     parameters
     ----------
@@ -73,64 +107,116 @@ class gymPolicyDiscreteFromCon(Policy):
         A list with the limits per interval, if None no limits are applied.
         Default is None
     epsilon: float
-
+    dense: bool
+        Default False. If True the table is a flat integer array indexed
+        by the cell id instead of a dictionary. Only recommended when the
+        number of cells fits in memory.
+    rng: int, np.random.Generator or bufferedRNG
+        Default None. Generator or seed for the exploration, its random
+        actions and the initial action of each cell. If None the global
+        np.random state is used.
     """
-    def __init__(self, env, steps:list, limits = None, epsilon:float = 0.0):
+    def __init__(self, env, steps:list, limits = None, epsilon:float = 0.0, dense:bool = False, rng = None):
         
         self.spaces = toDiscreteSpace(env.observation_space, steps, limits)
-        self.observation_space = cartesian_product(*self.spaces)
         self.aS = env.action_space
-        self.pi = dict()
-
-        # using the product to make a dictionary
-        for i in self.observation_space:
-            i = tuple(i.tolist())
-            self.pi[i] = self.aS.sample()
-        # deleting the product
-
-        self.steps, self.boxes = steps, []
-        self.low = env.observation_space.low
-        self.high = env.observation_space.high
-        if limits is None:
-            limits = [None for i in steps]
+
+        self.discretizer = boxDiscretizer(env.observation_space, steps, limits)
+        self.steps = steps
+        self.low, self.high = self.discretizer.low, self.discretizer.high
+        self.boxes = self.discretizer.boxes.tolist()
+        self.dense = dense
+        self.rng = getRNG(rng)
+        if dense:
+            # -1 marks the cells not visited yet
+            self.pi = np.full(int(np.prod(self.boxes, dtype=np.int64)), -1, dtype=INT_DEFT)
         else:
-            for i, l in enumerate(limits):
-                if l is not None:
-                    self.low[i] = l[0]
-                    self.high[i] = l[1]
-        for l, h, step_, limit in zip(self.low, self.high, steps, limits):
-        # Calculating how many boxes are needed
-            if limit is not None:
-                l,h = limit
-            self.boxes += [ceil(abs(h - l)/step_)]
+            self.pi = _lazyPolicyTable(self._sampleAction)
         self.epsilon = epsilon
         self.test = False
 
+    @property
+    def observation_space(self):
+        """
+        Array with all the discrete states. Warning, this materializes
+        the product of all the dimensions.
+        """
+        return cartesian_product(*self.spaces)
+
     def getAction(self, state):
-        if (np.random.uniform() > self.epsilon) or self.test:
-            tupleState = self.getState(state)
-            return self.pi[tupleState]
-        return self.aS.sample()
+        if (self.rng.random() > self.epsilon) or self.test:
+            return self._getPi(self.getIndex(state))
+        return self._sampleAction()
+
+    def _sampleAction(self):
+        start = int(getattr(self.aS, "start", 0))
+        return int(self.rng.integers(start, start + self.aS.n))
+
+    def getActions(self, states):
+        """
+        Returns the array of actions for the batch of observations
+        of shape (N, D).
+        """
+        index = self.discretizer.getIndex(states)
+        n = len(index)
+        if self.dense:
+            cells = np.ravel_multi_index(index.T, self.discretizer.boxes)
+            actions = self.pi[cells]
+            for cell in np.unique(cells[actions < 0]):
+                self.pi[cell] = self._sampleAction()
+            actions = self.pi[cells].astype(np.int64)
+        else:
+            actions = np.array([self.pi[i] for i in map(tuple, index.tolist())], dtype=np.int64)
+        if not self.test:
+            explore = self.rng.random(size=n) <= self.epsilon
+            k = int(explore.sum())
+            if k > 0:
+                start = int(getattr(self.aS, "start", 0))
+                actions[explore] = self.rng.integers(start, start + self.aS.n, size=k)
+        return actions
 
     def update(self, state, action):
         assert self.aS.contains(action), "Action must be contained in the environtment's action space"
-        tupleState = self.getState(state)
-        self.pi[tupleState] = action 
+        index = self.getIndex(state)
+        if self.dense:
+            self.pi[np.ravel_multi_index(index, self.boxes)] = action
+        else:
+            self.pi[index] = action
 
-    def getState(self, state):
+    def _getPi(self, index):
+        if not self.dense:
+            return self.pi[index]
+        cell = np.ravel_multi_index(index, self.boxes)
+        action = self.pi[cell]
+        if action < 0:
+            action = self.pi[cell] = self._sampleAction()
+        return int(action)
+
+    def getIndex(self, state):
         """
-        Process a continuos input state into the discrete one. Returns a hashable 
-        tuple.
+        Process a continuos input state into the tuple with the integer
+        position of its cell per dimension.
         """
         state = checkForTuple(state)
         assert len(state) == len(self.boxes), "State input must have the same shape as observation_space"
         pos = []
-        for s, l, step, b, space in zip(state, self.low, self.steps, self.boxes, self.spaces):
+        for s, l, step, b in zip(state, self.low, self.steps, self.boxes):
             i = floor((s - l) / step)
             # Bound 
             if i < 0:
                 i = 0
             elif i >= b:
                 i = b - 1
-            pos += [space[i]]
-        return tuple(pos)
\ No newline at end of file
+            pos += [i]
+        return tuple(pos)
+
+    def getState(self, state):
+        """
+        Process a continuos input state into the discrete one. Returns the
+        key of the state on pi, the tuple of getIndex or, when dense, the
+        flat id of the cell.
+        """
+        index = self.getIndex(state)
+        if self.dense:
+            return int(np.ravel_multi_index(index, self.boxes))
+        return index
\ No newline at end of file
@@ -1,37 +1,54 @@
-from RL_Toy.base import Policy, Environment
+from RL_Toy.base import Policy, Environment, ActionSpace
+from RL_Toy.base.rng import getRNG
 from RL_Toy.base.const import *
 
 class uniformRandomPolicy(Policy):
-    def __init__(self, env:Environment):
+    def __init__(self, env:Environment, rng = None):
         self.pi = env.actionSpace
         self.env = env
+        self.rng = getRNG(rng if rng is not None else getattr(env, "rng", None))
 
     def getAction(self, state):
+        if isinstance(self.pi, ActionSpace):
+            return self.rng.integers(self.pi.mV, self.pi.mV + self.pi.n)
         return self.pi.sample()
 
     def update(self, state, action):
         pass # Do nothing
 
 class gridPolicy(Policy):
-    def __init__(self, env:Environment):
+    def __init__(self, env:Environment, rng = None):
         self.pi = np.zeros(env.shape, dtype=UINT_DEFT)
         # or could be a dict() as well
         self.env = env
+        self.rng = getRNG(rng if rng is not None else getattr(env, "rng", None))
         self.randomInit()
 
     def randomInit(self):
-        for state in self.env.observationSpace:
-            self.pi[state] = self.env.actionSpace.sample()
+        states = getattr(self.env, "stateArray", None)
+        if states is None:
+            for state in self.env.observationSpace:
+                self.pi[state] = self.env.actionSpace.sample()
+            return
+        aS = self.env.actionSpace
+        self.pi[tuple(states.T)] = self.rng.integers(aS.mV, aS.mV + aS.n, size=len(states))
 
-    def update(self, state, action):
+    def _cell(self, state):
+        """
+        Position on pi of a state given as a dictionary, a position or
+        the integer index of the observation mode "index".
+        """
         if isinstance(state, dict):
-            state = state["agent"]
-        self.pi[state] = action
+            return state["agent"]
+        if isinstance(state, (int, np.integer)):
+            return self.env.indexToState(state)
+        return state
+
+    def update(self, state, action):
+        self.pi[self._cell(state)] = action
 
     def getAction(self, state):
-        if isinstance(state, dict):
-            state = state["agent"]
-        return self.pi[state]
+        return self.pi[self._cell(state)]
 
 class gridPolicyEpsilon(gridPolicy):
     """
@@ -46,14 +63,18 @@ class gridPolicyEpsilon(gridPolicy):
         Optional. A string from options: linear, exponential, none. For the epsilon decay
     mode_steps:
         Integer for the mode of the epsilon decay.
+    rng:
+        Optional. Generator or seed for the random actions. If None the
+        environment's rng or the global np.random state is used.
     """
     def __init__(self, env: Environment, 
                     epsilon: float = 0.1,
                     epsilon_min: float = 0.0,
                     mode: str = 'none', 
-                    mode_steps: int = 10 ** 3):
+                    mode_steps: int = 10 ** 3,
+                    rng = None):
         assert (epsilon >= 0) and (epsilon <= 1), "Epsilon needs to be a float in [0,1]"
-        super(gridPolicyEpsilon, self).__init__(env)
+        super(gridPolicyEpsilon, self).__init__(env, rng)
         self.epsilon = self.epsilon_init = epsilon
         self.epsilon_min = epsilon_min if 1 >= epsilon_min >= 0.0 else 0.0
         self.epsilon_mode = mode if mode in ['linear', 'exponential'] else 'none'
@@ -69,13 +90,12 @@ class gridPolicyEpsilon(gridPolicy):
         else:
             self._epsilon_decay_()
 
-        throw = np.random.uniform()
+        throw = self.rng.random()
         if throw < self.epsilon:
-            action = self.env.actionSpace.sample()
+            aS = self.env.actionSpace
+            action = self.rng.integers(aS.mV, aS.mV + aS.n)
         else:
-            if isinstance(state, dict):
-                state = state["agent"]
-            action = self.pi[state]
+            action = self.pi[self._cell(state)]
         return action
 
     def _epsilon_decay_(self):
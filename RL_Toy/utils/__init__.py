@@ -1,3 +1,7 @@
 from RL_Toy.utils.utils import runEnv, render, runPolicy, runAgent
-from RL_Toy.utils.functions import Q_function, checkForTuple
-from RL_Toy.utils.vars import Variable, linearSchedule
+from RL_Toy.utils.functions import Q_function, Q_array, checkForTuple, boxDiscretizer
+from RL_Toy.utils.vars import Variable, schedule, linearSchedule, exponentialSchedule, cosineSchedule, \
+    piecewiseSchedule, warmupSchedule
+from RL_Toy.utils.recorder import gifRecorder
+from RL_Toy.utils.rollout import rolloutBuffer
+from RL_Toy.utils.replay import replayBuffer
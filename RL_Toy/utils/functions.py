@@ -69,6 +69,100 @@ class Q_function():
             return self.DEF_ACTION
         return self.AS.sample()
 
+class Q_array(Q_function):
+    """
+    Action-value function in a dense array of shape state_shape + (n_actions,).
+    For environments with a known and discrete set of states like gridWorld.
+
+    Parameters
+    ----------
+    env: Environment
+        Default None. If given, the shape and the actions are taken from
+        env.shape and env.actionSpace. With obsMode "index" the integer
+        states are mapped to their position with env.indexToState.
+    shape: tuple of int
+        Default None. Shape of the states when env is not given.
+    nActions: int
+        Default None. Number of actions when env is not given.
+    minAction: int
+        Default 0. Value of the first action when env is not given.
+    initValue: float
+        Default 0. Initial value for all the pairs.
+    """
+    _indexEnv = None
+
+    def __init__(self, env:Environment = None, shape:tuple = None, nActions:int = None,
+                 minAction:int = 0, initValue:float = 0.0):
+        if env is not None:
+            self.AS = env.actionSpace
+            shape, nActions, minAction = env.shape, self.AS.n, self.AS.mV
+            if getattr(env, "obsMode", None) == "index":
+                self._indexEnv = env
+        assert (shape is not None) and (nActions is not None), \
+            "Needs an environment or the shape and number of actions"
+        self.mA = minAction
+        self.values = np.full(tuple(shape) + (nActions,), initValue, dtype=FLOAT_DEFT)
+
+    @property
+    def shape(self):
+        return self.values.shape[:-1]
+
+    def _state(self, state):
+        if isinstance(state, dict):
+            state = state["agent"]
+        if (self._indexEnv is not None) and isinstance(state, (int, np.integer)):
+            return self._indexEnv.indexToState(int(state))
+        return self.decomposeState(state)
+
+    def _states(self, states):
+        # Batch of positions, from the integer states on obsMode "index"
+        states = np.asarray(states)
+        if (self._indexEnv is not None) and (states.ndim == 1):
+            states = self._indexEnv.stateArray[states]
+        return tuple(states.T)
+
+    def _index(self, state_action):
+        state = self._state(state_action[0])
+        action = self.decomposeAction(state_action[1])
+        if not isinstance(state, tuple):
+            state = (state,)
+        return state + (action - self.mA,)
+
+    def __getitem__(self, state_action):
+        return self.values[self._index(state_action)]
+
+    def __setitem__(self, state_action, value):
+        self.values[self._index(state_action)] = value
+
+    def maxAction(self, state):
+        state = self._state(state)
+        return int(self.values[state].argmax()) + self.mA
+
+    def getStates(self):
+        return np.ndindex(*self.shape)
+
+    def getBatch(self, states, actions):
+        """
+        Returns the values of the pairs from the arrays states of 
+        shape (N, D), or (N,) with obsMode "index", and actions of
+        shape (N,).
+        """
+        return self.values[self._states(states) + (np.asarray(actions) - self.mA,)]
+
+    def setBatch(self, states, actions, values):
+        """
+        Assigns the values to the pairs from the arrays states of 
+        shape (N, D) and actions of shape (N,).
+        """
+        self.values[self._states(states) + (np.asarray(actions) - self.mA,)] = values
+
+    def maxActionBatch(self, states):
+        """
+        Returns the array of the greedy actions for the array states of
+        shape (N, D).
+        """
+        return self.values[self._states(states)].argmax(axis=-1) + self.mA
+
 def checkForTuple(obj):
     if isinstance(obj, np.ndarray):
         return tuple(obj.tolist())
@@ -107,6 +201,54 @@ def toDiscreteSpace(box_space, step: list, limits = None):
 
     return spaces
 
+class boxDiscretizer():
+    """
+    Maps batches of observations from a continuos space to the integer
+    position of their cells with the same steps and limits as 
+    toDiscreteSpace.
+
+    parameters
+    ----------
+    box_space: gym.spaces.Box
+        Expecting a box type of space to generate a discrete one
+    steps: list
+        A list with the step sizes for each dimension. This should match
+        the observation_space.shape
+    limits: list
+        A list with the limits per interval, if None no limits are applied.
+        Default is None
+    """
+    def __init__(self, box_space, steps: list, limits = None):
+        self.low = np.array(box_space.low, dtype=np.float64)
+        self.high = np.array(box_space.high, dtype=np.float64)
+        if limits is not None:
+            for i, l in enumerate(limits):
+                if l is not None:
+                    self.low[i], self.high[i] = l
+        self.steps = np.array(steps, dtype=np.float64)
+        self.boxes = np.array([ceil(abs(h - l) / s) for l, h, s in zip(self.low, self.high, self.steps)],
+                              dtype=np.int64)
+
+    @property
+    def nCells(self):
+        return int(np.prod(self.boxes))
+
+    def getIndex(self, obs):
+        """
+        Returns the integer array of shape (N, D) with the position of the
+        cell per dimension from the observations of shape (N, D).
+        """
+        obs = np.asarray(obs, dtype=np.float64)
+        index = np.floor((obs - self.low) / self.steps).astype(np.int64)
+        return np.clip(index, 0, self.boxes - 1)
+
+    def getCell(self, obs):
+        """
+        Returns the array of shape (N,) with the flat id of the cell
+        from the observations of shape (N, D).
+        """
+        return np.ravel_multi_index(self.getIndex(obs).T, self.boxes)
+
 def cartesian_product(*arrays):
     """
     Cartesian product of ndarrays
@@ -0,0 +1,187 @@
+"""
+    Streaming GIF writer. Frames are encoded as soon as they arrive so the
+    memory used does not depend on the length of the recording.
+"""
+from typing import Union
+from collections import deque
+from io import BytesIO
+from pathlib import Path
+import shutil
+import tempfile
+
+GIF_TRAILER = b"\x3B"
+GIF_LOOP = b"\x21\xFF\x0BNETSCAPE2.0\x03\x01\x00\x00\x00"
+
+class gifRecorder():
+    """
+    Records rgb frames into a GIF file on disk, one frame at the time.
+
+    Parameters
+    ----------
+    path: str or Path
+        Path of the GIF to write. If str is relative to the current
+        working directory.
+    fps: int
+        Default 24. Frames per second of the GIF.
+    frameSkip: int
+        Default 1. Only one of each frameSkip frames is recorded.
+    maxFrames: int
+        Default None. Maximum number of frames to keep, the rest are
+        ignored. With lastEpisodes the oldest episodes are dropped to
+        make room for the frames of the newer ones.
+    lastEpisodes: int
+        Default None. If given only the frames of the last lastEpisodes
+        episodes are kept. Episodes are closed with endEpisode and stored
+        in temporary files until close is called.
+
+    Nothing is written if no frame is recorded.
+    """
+    def __init__(self, path: Union[str, Path], fps: int = 24, frameSkip: int = 1,
+                 maxFrames: int = None, lastEpisodes: int = None):
+        if isinstance(path, str):
+            path = Path.cwd() / path
+        self.path = path
+        self.delay = max(1, round(100 / max(1, fps)))
+        self.frameSkip = max(1, frameSkip)
+        self.maxFrames = maxFrames
+        self.lastEpisodes = lastEpisodes
+        self.nFrames = 0
+        self._calls = 0
+        self._size = None
+        self._file = None
+        if lastEpisodes is not None:
+            assert lastEpisodes > 0, "lastEpisodes must be positive"
+            self._tmpDir = tempfile.TemporaryDirectory()
+            # Path and number of frames of each episode kept
+            self._episodes = deque()
+            self._nEpisode = 0
+
+    @property
+    def full(self):
+        if (self.maxFrames is None) or (self.nFrames < self.maxFrames):
+            return False
+        # The closed episodes can still give room to the newer frames
+        return (self.lastEpisodes is None) or (self._closedEpisodes() == 0)
+
+    def _closedEpisodes(self):
+        return len(self._episodes) - (1 if self._file is not None else 0)
+
+    def _dropEpisode(self):
+        episode, frames = self._episodes.popleft()
+        Path(episode).unlink()
+        self.nFrames -= frames
+
+    def capture(self, env):
+        """
+        Adds the actual frame of the environment if this call is not
+        skipped. The environment is only rendered when needed.
+        """
+        self._calls += 1
+        if ((self._calls - 1) % self.frameSkip != 0) or self.full:
+            return False
+        self._write(env.render(mode="rgb_array"))
+        return True
+
+    def addFrame(self, frame):
+        """
+        Adds an rgb frame of shape (height, width, 3) if this call is
+        not skipped.
+        """
+        self._calls += 1
+        if ((self._calls - 1) % self.frameSkip != 0) or self.full:
+            return False
+        self._write(frame)
+        return True
+
+    def endEpisode(self):
+        """
+        Marks the end of an episode. Only needed with lastEpisodes.
+        """
+        if self.lastEpisodes is None or self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        while len(self._episodes) > self.lastEpisodes:
+            self._dropEpisode()
+
+    def close(self):
+        """
+        Finishes the GIF file and returns its path, or None without
+        writing anything if no frame was recorded.
+        """
+        if self.lastEpisodes is not None:
+            self.endEpisode()
+            if self.nFrames > 0:
+                with open(self.path, "wb") as file_:
+                    file_.write(self._header())
+                    for episode, _ in self._episodes:
+                        with open(episode, "rb") as chunk:
+                            shutil.copyfileobj(chunk, file_)
+                    file_.write(GIF_TRAILER)
+            self._tmpDir.cleanup()
+            self._episodes.clear()
+        elif self._file is not None:
+            self._file.write(GIF_TRAILER)
+            self._file.close()
+            self._file = None
+        return self.path if self.nFrames > 0 else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _write(self, frame):
+        if self._size is None:
+            self._size = (frame.shape[1], frame.shape[0])
+            if self.lastEpisodes is None:
+                # Opened with the first frame, empty recordings write nothing
+                self._file = open(self.path, "wb")
+                self._file.write(self._header())
+        if self.lastEpisodes is not None:
+            if self._file is None:
+                # New episode chunk
+                episode = Path(self._tmpDir.name) / "episode_{}.bin".format(self._nEpisode)
+                self._nEpisode += 1
+                self._episodes.append([episode, 0])
+                self._file = open(episode, "wb")
+            while (self.maxFrames is not None) and (self.nFrames >= self.maxFrames):
+                self._dropEpisode()
+            self._episodes[-1][1] += 1
+        self._file.write(self._encode(frame))
+        self.nFrames += 1
+
+    def _header(self):
+        w, h = self._size if self._size is not None else (1, 1)
+        return b"GIF89a" + w.to_bytes(2, "little") + h.to_bytes(2, "little") \
+            + b"\x00\x00\x00" + GIF_LOOP
+
+    def _encode(self, frame):
+        """
+        Encodes a frame with PIL as a single GIF and returns its image
+        block with the palette as a local color table.
+        """
+        from PIL import Image
+        buffer = BytesIO()
+        Image.fromarray(frame).quantize(colors=256).save(buffer, format="GIF")
+        data = buffer.getvalue()
+        packed, i, table, bits = data[10], 13, b"", 0
+        if packed & 0x80:
+            bits = packed & 0x07
+            size = 3 * 2 ** (bits + 1)
+            table = data[i:i + size]
+            i += size
+        # Skip the extensions
+        while data[i] == 0x21:
+            i += 2
+            while data[i] != 0:
+                i += data[i] + 1
+            i += 1
+        descriptor = bytearray(data[i:i + 10])
+        if not (descriptor[9] & 0x80):
+            descriptor[9] = (descriptor[9] & 0xF8) | 0x80 | bits
+        else:
+            table = b""
+        control = b"\x21\xF9\x04\x00" + self.delay.to_bytes(2, "little") + b"\x00\x00"
+        return control + bytes(descriptor) + table + data[i + 10:-1]
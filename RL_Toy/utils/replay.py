@@ -0,0 +1,120 @@
+from typing import Union
+from pathlib import Path
+from RL_Toy.base.const import *
+from RL_Toy.base.rng import getRNG
+
+class replayBuffer():
+    """
+    Fixed capacity circular replay memory with one typed array per
+    column. When full, the oldest transitions are overwritten.
+
+    Parameters
+    ----------
+    capacity: int
+        Maximum number of transitions to store.
+    stateShape: tuple of int
+        Default (). Shape of a single state, e.g. (2,) for the position
+        on a gridWorld.
+    stateDtype: numpy dtype
+        Default FLOAT_DEFT. Type of the states and next states.
+    actionDtype: numpy dtype
+        Default INT_DEFT. Type of the actions.
+    actionShape: tuple of int
+        Default (). Shape of a single action.
+    path: str or Path
+        Default None. If given the columns are np.memmap files on this
+        directory instead of arrays in memory.
+    rng: int, np.random.Generator or bufferedRNG
+        Default None. Generator or seed for the samples. If None the
+        global np.random state is used.
+    """
+    def __init__(self, capacity:int, stateShape:tuple = (), stateDtype = FLOAT_DEFT,
+                 actionDtype = INT_DEFT, actionShape:tuple = (), path: Union[str, Path] = None,
+                 rng = None):
+        assert capacity > 0, "Capacity must be positive"
+        self.capacity = capacity
+        self.size = 0
+        self._i = 0
+        self.rng = getRNG(rng)
+        self.path = Path(path) if path is not None else None
+        if self.path is not None:
+            self.path.mkdir(parents=True, exist_ok=True)
+        stateShape, actionShape = tuple(stateShape), tuple(actionShape)
+        self.states = self._column("states", stateShape, stateDtype)
+        self.nextStates = self._column("nextStates", stateShape, stateDtype)
+        self.actions = self._column("actions", actionShape, actionDtype)
+        self.rewards = self._column("rewards", (), FLOAT_DEFT)
+        self.dones = self._column("dones", (), UINT_DEFT)
+
+    def _column(self, name:str, shape:tuple, dtype):
+        shape = (self.capacity,) + shape
+        if self.path is None:
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(self.path / "{}.dat".format(name), dtype=dtype, mode="w+", shape=shape)
+
+    def __len__(self):
+        return self.size
+
+    @staticmethod
+    def _state(state):
+        if isinstance(state, dict):
+            return state["agent"]
+        return state
+
+    def add(self, state, action, reward, nextState, done):
+        """
+        Writes a single transition. Dictionary states from the RL_Toy
+        environments are stored by their "agent" item.
+        """
+        i = self._i
+        self.states[i] = self._state(state)
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.nextStates[i] = self._state(nextState)
+        self.dones[i] = done
+        self._i = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def addBatch(self, states, actions, rewards, nextStates, dones):
+        """
+        Writes a batch of transitions, each argument is an array with the
+        batch on its first axis.
+        """
+        n = len(rewards)
+        if n > self.capacity:
+            # Only the last ones would remain
+            states, actions, rewards = states[-self.capacity:], actions[-self.capacity:], rewards[-self.capacity:]
+            nextStates, dones = nextStates[-self.capacity:], dones[-self.capacity:]
+            self._i = (self._i + n - self.capacity) % self.capacity
+            n = self.capacity
+        index = (self._i + np.arange(n)) % self.capacity
+        self.states[index] = states
+        self.actions[index] = actions
+        self.rewards[index] = rewards
+        self.nextStates[index] = nextStates
+        self.dones[index] = dones
+        self._i = (self._i + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+
+    def sample(self, batchSize:int):
+        """
+        Uniform sample with replacement of the stored transitions.
+
+        Returns
+        -------
+        states, actions, rewards, nextStates, dones
+        """
+        assert self.size > 0, "The buffer is empty"
+        index = np.asarray(self.rng.integers(0, self.size, size=batchSize))
+        # Sorted for sequential reads on the memory mapped files
+        index.sort()
+        return (self.states[index], self.actions[index], self.rewards[index],
+                self.nextStates[index], self.dones[index])
+
+    def flush(self):
+        """
+        Writes the memory mapped columns to disk.
+        """
+        if self.path is not None:
+            for column in (self.states, self.actions, self.rewards, self.nextStates, self.dones):
+                column.flush()
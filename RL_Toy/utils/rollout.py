@@ -0,0 +1,124 @@
+from RL_Toy.base.const import *
+
+class rolloutBuffer():
+    """
+    Trajectories from an Agent stored in a structure of arrays. The
+    arrays are allocated once and doubled in size when full.
+
+    Parameters
+    ----------
+    capacity: int
+        Default 1024. Initial number of transitions allocated.
+
+    The properties states, actions, rewards, episodeSteps and dones
+    return views of the filled part of the arrays, no copies are made.
+    These views are not updated if the arrays grow afterwards.
+    """
+    COLUMNS = ("states", "actions", "rewards", "episodeSteps", "dones")
+
+    def __init__(self, capacity:int = 1024):
+        assert capacity > 0, "Capacity must be positive"
+        self.capacity = capacity
+        self.size = 0
+        self._columns = None
+
+    def __len__(self):
+        return self.size
+
+    def _allocate(self, state, action):
+        state, action = np.asarray(state), np.asarray(action)
+        self._columns = {
+            "states": np.empty((self.capacity,) + state.shape, dtype=state.dtype),
+            "actions": np.empty((self.capacity,) + action.shape, dtype=action.dtype),
+            "rewards": np.empty(self.capacity, dtype=FLOAT_DEFT),
+            "episodeSteps": np.empty(self.capacity, dtype=INT_DEFT),
+            "dones": np.empty(self.capacity, dtype=np.bool_),
+            }
+
+    def _grow(self):
+        self.capacity *= 2
+        for name, column in self._columns.items():
+            new = np.empty((self.capacity,) + column.shape[1:], dtype=column.dtype)
+            new[:self.size] = column[:self.size]
+            self._columns[name] = new
+
+    def add(self, state, action, reward, episodeSteps:int, done:bool):
+        """
+        Writes a transition. Dictionary states from the RL_Toy
+        environments are stored by their "agent" item.
+        """
+        if isinstance(state, dict):
+            state = state["agent"]
+        if self._columns is None:
+            self._allocate(state, action)
+        elif self.size == self.capacity:
+            self._grow()
+        i, c = self.size, self._columns
+        c["states"][i] = state
+        c["actions"][i] = action
+        c["rewards"][i] = reward
+        c["episodeSteps"][i] = episodeSteps
+        c["dones"][i] = done
+        self.size += 1
+
+    def collect(self, agent, steps:int = None, episodes:int = None):
+        """
+        Runs agent.step and stores the transitions until the number
+        of steps or of finished episodes is reached. Works with Agent
+        and AgentToy.
+
+        Returns
+        -------
+        self
+        """
+        assert (steps is not None) or (episodes is not None), \
+            "Needs a number of steps or episodes to collect"
+        n, finished = 0, 0
+        while ((steps is None) or (n < steps)) and ((episodes is None) or (finished < episodes)):
+            state, action, reward, episodeSteps, done = agent.step()[:5]
+            self.add(state, action, reward, episodeSteps, done)
+            n += 1
+            finished += 1 if done else 0
+        return self
+
+    def clear(self):
+        """
+        Empties the buffer, the arrays are kept for reuse.
+        """
+        self.size = 0
+
+    def _view(self, name):
+        if self._columns is None:
+            return np.empty(0)
+        return self._columns[name][:self.size]
+
+    @property
+    def states(self):
+        return self._view("states")
+
+    @property
+    def actions(self):
+        return self._view("actions")
+
+    @property
+    def rewards(self):
+        return self._view("rewards")
+
+    @property
+    def episodeSteps(self):
+        return self._view("episodeSteps")
+
+    @property
+    def dones(self):
+        return self._view("dones")
+
+    def episodeBounds(self):
+        """
+        Returns the arrays starts and ends with the limits [start, end)
+        of each episode in the buffer. The first and last can be partial.
+        """
+        starts = np.flatnonzero(self.episodeSteps == 1)
+        if self.size > 0 and (len(starts) == 0 or starts[0] != 0):
+            starts = np.concatenate(([0], starts))
+        ends = np.concatenate((starts[1:], [self.size])) if self.size > 0 else starts
+        return starts, ends
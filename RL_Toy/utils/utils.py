@@ -1,53 +1,67 @@
+"""
+    Rendering and notebook helpers. matplotlib, gif and IPython are
+    imported when these functions are called, not with the package.
+"""
 from typing import Union
-import gif
 import time
-from IPython.display import display, Image
 from RL_Toy.base.const import *
+from RL_Toy.utils.recorder import gifRecorder
 from pathlib import Path
 
-render = lambda e : plt.imshow(e.render(mode = 'rgb_array')) 
+def render(e):
+    import matplotlib.pyplot as plt
+    return plt.imshow(e.render(mode = 'rgb_array'))
 
-@gif.frame
 def frame(e):
-    plt.imshow(e.render(mode = "rgb_array"))
+    import gif
+    import matplotlib.pyplot as plt
+    @gif.frame
+    def plotFrame():
+        plt.imshow(e.render(mode = "rgb_array"))
+    return plotFrame()
 
 def timeFormatedS() -> str:
     return time.strftime("%H-%M-%S_%d-%b-%y", time.gmtime())
 
 def playGif(src: Union[str, Path]):
+    from IPython.display import display, Image
     with open(src,'rb') as file_:
         display(Image(file_.read()))
 
 def saveGif(frames, path: Union[str, Path], fps: int = 24):
+    import gif
     duration_between = int(1000 / max(1, fps))
     if isinstance(path, str):
         path = Path.cwd() / path
     gif.save(frames, str(path), duration=duration_between)
     return path
     
-def runEnv(env, steps:int, name:str = "lrun", fps: int = 24):
+def runEnv(env, steps:int, name:str = "lrun", fps: int = 24, **kwargs):
     """
-    Run random steps in the environment
+    Run random steps in the environment. The extra keyword arguments
+    frameSkip, maxFrames and lastEpisodes are passed to gifRecorder.
     """
     name = name + ".gif"
-    frames = []
+    recorder = gifRecorder(name, fps=fps, **kwargs)
     totR, epR, eps = 0, 0, 1
     env.reset()
     for _ in range(steps):
-        frames.append(frame(env))
+        recorder.capture(env)
         _, reward, done, _= env.step(env.action_space.sample())
         epR += reward
         if done: 
             env.reset()
+            recorder.endEpisode()
             eps += 1
             totR += epR
             epR = 0
     totR = totR / eps
-    gif_path = saveGif(frames, name, fps=fps)
+    gif_path = recorder.close()
     print(f"Last run accumulate reward {epR}\nMean accumulate Reward {totR:.2f}\nEpisodes {eps}")
-    playGif(gif_path)
+    if gif_path is not None:
+        playGif(gif_path)
 
-def runPolicy(env, policy, steps:int, name:str = None, fps: int = 24):
+def runPolicy(env, policy, steps:int, name:str = None, fps: int = 24, **kwargs):
     """
     Runs, generates and displays a gif in the colab notebook for gym classic control
     environments. Others like ALE don't need this method to display.
@@ -67,32 +81,37 @@ def runPolicy(env, policy, steps:int, name:str = None, fps: int = 24):
         name for the gif to be named after
     fps: int, default 24
         Frames per second for generated GIF
+    frameSkip, maxFrames, lastEpisodes: int, optional
+        Passed to gifRecorder. The frames are written to disk as they
+        are produced.
     """
     name = name + ".gif" if name is not None else "runPolicy {}.gif".format(timeFormatedS())
-    frames = []
+    recorder = gifRecorder(name, fps=fps, **kwargs)
     policy.test = True
     totR, epR, eps = 0, 0, 1
     obs = env.reset()
     for _ in range(steps):
-        frames.append(frame(env))
+        recorder.capture(env)
         action = policy.getAction(obs)
         obs, reward, done, _ = env.step(action)
         epR += reward
         if done: 
             obs = env.reset()
+            recorder.endEpisode()
             eps += 1
             totR += epR
             epR = 0
     totR = totR / eps
     policy.test = False
     # Creates .gif
-    gifPath = saveGif(frames, name, fps=fps)
+    gifPath = recorder.close()
     # Prints output
     print(f"Last run accumulate reward {epR}\nMean accumulate Reward {totR:.2f}\nEpisodes {eps}")
-    # Displays gif
-    playGif(gifPath)
+    # Displays gif, if any frame was recorded
+    if gifPath is not None:
+        playGif(gifPath)
     
-def runAgent(agent, steps:int, name: str = None, fps: int = 24):
+def runAgent(agent, steps:int, name: str = None, fps: int = 24, **kwargs):
     """
     Runs, generates and displays a gif in the colab notebook for gym classic control
     environments. Others like ALE don't need this method to display.
@@ -107,32 +126,37 @@ def runAgent(agent, steps:int, name: str = None, fps: int = 24):
         name for the gif to be named after
     fps: int, default 24
         Frames per second for generated GIF
+    frameSkip, maxFrames, lastEpisodes: int, optional
+        Passed to gifRecorder. The frames are written to disk as they
+        are produced.
     """
     env = agent.env_test if agent.env_test is not None else agent.env
     policy = agent.policy
     procObs = agent.processObs
     
     name = name + ".gif" if name is not None else "runPolicy {}.gif".format(timeFormatedS())
-    frames = []
+    recorder = gifRecorder(name, fps=fps, **kwargs)
     policy.test = True
     totR, epR, eps = 0, 0, 1
     obs = env.reset()
     for _ in range(steps):
-        frames.append(frame(env))
+        recorder.capture(env)
         state = procObs(obs)
         action = policy.getAction(state)
         obs, reward, done, _ = env.step(action)
         epR += reward
         if done: 
             obs = env.reset()
+            recorder.endEpisode()
             eps += 1
             totR += epR
             epR = 0
     totR = totR / eps
     policy.test = False
     # Creates .gif
-    gifPath = saveGif(frames, name, fps=fps)
+    gifPath = recorder.close()
     # Prints output
     print(f"Last run accumulate reward {epR}\nMean accumulate Reward {totR:.2f}\nEpisodes {eps}")
-    # Displays gif
-    playGif(gifPath)
\ No newline at end of file
+    # Displays gif, if any frame was recorded
+    if gifPath is not None:
+        playGif(gifPath)
\ No newline at end of file
@@ -2,6 +2,8 @@
 Scheduled variables, this can be moved each time they are called or by a moving method
 """
 from abc import ABC
+from math import pi
+import numpy as np
 
 class Variable(ABC):
     """
@@ -80,27 +82,137 @@ class Variable(ABC):
         self._step_()
         return self._value_.__floordiv__(other)
 
-class linearSchedule(Variable):
+class schedule(Variable):
+    """
+    Abstract class for a variable with a closed form value at each step.
+    The values up to the horizon, or TABLESIZE steps, are stored in a
+    lookup table when created.
+
+    valueAt(step) has no side effects and accepts an integer or an array
+    of steps, e.g. the step of each environment of a VecGridWorld.
+    """
+    TABLESIZE = 2**18
+
+    def _values(self, steps):
+        """
+        Values for an array of non negative steps.
+        """
+        raise NotImplementedError
+
+    def _build(self, horizon:int):
+        # Steps after horizon keep the value at horizon
+        self._horizon_ = max(0, int(horizon))
+        self._table_ = self._values(np.arange(min(self._horizon_ + 1, self.TABLESIZE)))
+        self._opvalue_ = self._value_ = self._table_[0].item()
+        self._i_ = 0
+
+    @property
+    def horizon(self):
+        return self._horizon_
+
+    def valueAt(self, step):
+        """
+        Value of the variable at step, or an array with the values if
+        step is an array. Does not move the variable.
+        """
+        steps = np.clip(np.asarray(step), 0, self._horizon_)
+        if (steps.dtype.kind in "iu") and (self._horizon_ < len(self._table_)):
+            values = self._table_[steps]
+        else:
+            values = self._values(steps)
+        return values if values.ndim else values.item()
+
+    value_at = valueAt
+
+    def _step_(self):
+        i = min(self._i_, self._horizon_)
+        self._value_ = self._table_[i].item() if i < len(self._table_) else self.valueAt(i)
+        self._i_ += 1
+
+class linearSchedule(schedule):
+    """
+    Linear change from initValue to minValue or maxValue in life steps.
+    """
     def __init__(self, initValue, life:int, minValue = None, maxValue = None):
         assert (minValue is not None) or (maxValue is not None), \
             "At least one of these must be not None to describe behavior"
         if minValue is not None:
             assert initValue >= minValue, "Initial value is less than minimal"
             self._last_ = minValue
-            self._F = max
+            self._F = np.maximum
         elif maxValue is not None:
             assert initValue <= maxValue, "Initial value is more than maximum"
             self._last_ = maxValue
-            self._F = min
-        self._opvalue_ = initValue
-        self._value_ = initValue
-        self._diff_ = self._last_ - self._opvalue_
-        self._i_ = 0
+            self._F = np.minimum
+        self._init_ = initValue
+        self._diff_ = self._last_ - initValue
         assert life > 0, "Life of the variable must be positive. Live Chill"
         self._life_ = life
+        self._build(life)
 
-    def _step_(self):
-        xm = self._diff_ * self._i_ / self._life_
-        y = self._opvalue_ + xm
-        self._i_ += 1
-        self._value_ = self._F(self._last_, y)
+    def _values(self, steps):
+        return self._F(self._last_, self._init_ + self._diff_ * steps / self._life_)
+
+class exponentialSchedule(schedule):
+    """
+    Geometric change from initValue to finalValue in life steps. Both
+    must be non zero and of the same sign.
+    """
+    def __init__(self, initValue, finalValue, life:int):
+        assert initValue * finalValue > 0, "Values must be non zero and of the same sign"
+        assert life > 0, "Life of the variable must be positive"
+        self._init_ = initValue
+        self._ratio_ = finalValue / initValue
+        self._life_ = life
+        self._build(life)
+
+    def _values(self, steps):
+        return self._init_ * np.power(self._ratio_, steps / self._life_)
+
+class cosineSchedule(schedule):
+    """
+    Half cosine change from initValue to finalValue in life steps.
+    """
+    def __init__(self, initValue, finalValue, life:int):
+        assert life > 0, "Life of the variable must be positive"
+        self._final_ = finalValue
+        self._diff_ = initValue - finalValue
+        self._life_ = life
+        self._build(life)
+
+    def _values(self, steps):
+        return self._final_ + 0.5 * self._diff_ * (1 + np.cos(pi * steps / self._life_))
+
+class piecewiseSchedule(schedule):
+    """
+    Linear interpolation between points, a list of (step, value) with
+    increasing steps. Before the first step the first value is used.
+    """
+    def __init__(self, points:list):
+        assert len(points) > 0, "At least one point is needed"
+        steps, values = zip(*points)
+        self._steps_ = np.asarray(steps, dtype=np.float64)
+        self._points_ = np.asarray(values, dtype=np.float64)
+        assert np.all(np.diff(self._steps_) > 0), "Steps must be increasing"
+        self._build(steps[-1])
+
+    def _values(self, steps):
+        return np.interp(steps, self._steps_, self._points_)
+
+class warmupSchedule(schedule):
+    """
+    Linear change from initValue to the first value of after during
+    warmup steps, then follows the schedule after.
+    """
+    def __init__(self, warmup:int, after:schedule, initValue = 0.0):
+        assert warmup > 0, "Warmup must be positive"
+        self._warmup_ = warmup
+        self._after_ = after
+        self._init_ = initValue
+        self._diff_ = after.valueAt(0) - initValue
+        self._build(warmup + after.horizon)
+
+    def _values(self, steps):
+        warm = self._init_ + self._diff_ * steps / self._warmup_
+        return np.where(steps < self._warmup_, warm,
+                        self._after_.valueAt(np.maximum(steps - self._warmup_, 0)))
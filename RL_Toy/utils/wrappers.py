@@ -1,5 +1,7 @@
 from typing import Any, Tuple
 from gym import Wrapper
+from gym.spaces import Box
+from RL_Toy.base.const import *
 
 class AtariRenderWrapper(Wrapper):
     def render(self, mode="human", **kwargs):
@@ -11,4 +13,111 @@ class StepCompatible(Wrapper):
         if len(result) > 4:
             return result[0], result[1], result[2], result[4]
         return result
-    
\ No newline at end of file
+    
+class AtariFrameStack(Wrapper):
+    """
+    Observation pipeline for ALE environments. Repeats each action
+    frameSkip times, max-pools the last two frames, downsamples them to
+    size, converts them to grayscale and stacks the last K frames.
+
+    All the buffers are allocated when created, nbytes gives their size.
+    The observations are views of a ring buffer that stores each frame
+    twice, so the last K frames are always contiguous and in order from
+    the oldest to the newest. They are overwritten by the next steps,
+    copy them to keep them.
+
+    Parameters
+    ----------
+    env: gym.Env
+        Environment with rgb frames of shape (height, width, 3) or
+        grayscale frames of shape (height, width).
+    K: int
+        Default 4. Number of frames to stack.
+    frameSkip: int
+        Default 4. Times each action is repeated, the rewards are summed.
+    size: tuple of int
+        Default (84, 84). Height and width of the frames after the nearest
+        neighbour downsampling.
+    grayscale: bool
+        Default True. Converts rgb frames to luminance.
+    """
+    LUMINANCE = (0.299, 0.587, 0.114)
+
+    def __init__(self, env, K:int = 4, frameSkip:int = 4, size:tuple = (84, 84), grayscale:bool = True):
+        super().__init__(env)
+        assert K > 0 and frameSkip > 0, "K and frameSkip must be positive"
+        self.K, self.frameSkip = K, frameSkip
+        shape = env.observation_space.shape
+        rawH, rawW = shape[:2]
+        channels = shape[2] if len(shape) > 2 else 1
+        h, w = size
+        self.grayscale = grayscale and (channels > 1)
+        # Flat index of the pixel sampled for each pixel of the output
+        rows = np.arange(h) * rawH // h
+        cols = np.arange(w) * rawW // w
+        self._pixels = (rows[:,None] * rawW + cols[None,:]).ravel()
+        self._small = np.empty((2, h * w, channels), dtype=np.uint8)
+        frameShape = (h, w) if (self.grayscale or channels == 1) else (h, w, channels)
+        if self.grayscale:
+            self._weights = np.array(self.LUMINANCE, dtype=FLOAT_DEFT)
+            self._color = np.empty((h * w, channels), dtype=FLOAT_DEFT)
+            self._gray = np.empty(h * w, dtype=FLOAT_DEFT)
+        self._frames = np.zeros((2 * K,) + frameShape, dtype=np.uint8)
+        self._i = K - 1
+        self.observation_space = Box(0, 255, (K,) + frameShape, dtype=np.uint8)
+
+    @property
+    def nbytes(self):
+        buffers = (self._pixels, self._small, self._frames)
+        if self.grayscale:
+            buffers += (self._color, self._gray)
+        return sum(x.nbytes for x in buffers)
+
+    def _sample(self, obs, out):
+        # Downsampled frame into out without allocations
+        obs = np.asarray(obs)
+        np.take(obs.reshape(len(obs) * obs.shape[1], -1), self._pixels, axis=0, out=out, mode="clip")
+
+    def _push(self, small):
+        """
+        Writes the frame on the ring buffer and returns the view of the
+        last K frames.
+        """
+        self._i = (self._i + 1) % self.K
+        slot = self._frames[self._i]
+        if self.grayscale:
+            np.copyto(self._color, small)
+            np.dot(self._color, self._weights, out=self._gray)
+            np.add(self._gray, 0.5, out=self._gray)
+            np.copyto(slot.reshape(-1), self._gray, casting="unsafe")
+        else:
+            np.copyto(slot.reshape(small.shape), small)
+        self._frames[self._i + self.K] = slot
+        return self._frames[self._i + 1:self._i + 1 + self.K]
+
+    def reset(self, **kwargs):
+        result = self.env.reset(**kwargs)
+        obs = result[0] if isinstance(result, tuple) else result
+        self._sample(obs, self._small[0])
+        for _ in range(self.K):
+            stack = self._push(self._small[0])
+        if isinstance(result, tuple):
+            return (stack,) + result[1:]
+        return stack
+
+    def step(self, action: Any) -> Tuple[Any, float, bool, dict]:
+        total = 0.0
+        for k in range(self.frameSkip):
+            result = self.env.step(action)
+            if len(result) > 4:
+                obs, reward, done, info = result[0], result[1], result[2] or result[3], result[4]
+            else:
+                obs, reward, done, info = result
+            total += reward
+            # The last two frames alternate between both buffers
+            self._sample(obs, self._small[k % 2])
+            if done:
+                break
+        if k > 0:
+            np.maximum(self._small[0], self._small[1], out=self._small[0])
+        return self._push(self._small[0]), total, done, info
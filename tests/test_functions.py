@@ -0,0 +1,38 @@
+import numpy as np
+from RL_Toy.envs import gridWorld
+from RL_Toy.utils import Q_array
+
+def indexEnv():
+    env = gridWorld(6, 4, (0, 0), (5, 3), obsMode="index")
+    env.addObstacles((1, 1))
+    env.reset()
+    return env
+
+def test_q_array_index_states():
+    env = indexEnv()
+    Q = Q_array(env)
+    for i in range(len(env.observationSpace)):
+        Q[(i, 3)] = i + 1.0
+    for i in range(len(env.observationSpace)):
+        x, y = env.indexToState(i)
+        assert Q.values[x, y, 3 - Q.mA] == i + 1.0
+        assert Q[(np.int64(i), 3)] == i + 1.0
+        assert Q.maxAction(i) == 3
+
+def test_q_array_index_batch():
+    env = indexEnv()
+    Q = Q_array(env)
+    states = np.arange(len(env.observationSpace))
+    actions = np.full(len(states), 2)
+    Q.setBatch(states, actions, states + 1.0)
+    assert np.array_equal(Q.getBatch(states, actions), states + 1.0)
+    assert np.array_equal(Q.maxActionBatch(states), actions)
+    assert Q.values[1, 1].sum() == 0
+
+def test_q_array_positions():
+    env = gridWorld(6, 4, (0, 0), (5, 3))
+    Q = Q_array(env)
+    Q[((2, 1), 4)] = 1.0
+    assert Q[({"agent": (2, 1)}, 4)] == 1.0
+    assert Q.maxAction((2, 1)) == 4
+    assert np.array_equal(Q.getBatch([[2, 1]], [4]), [1.0])